@@ -6,7 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 
 # Import Base and all your models
-from app.models import user, company, equipment, sensor_data  # Import all your model files
+from app.models import user, company, equipment, sensor_data, ingestion_checkpoint, sensor_data_count, sensor_data_rollup, retention_policy  # Import all your model files
 from app.core.database import Base
 from app.core.config import settings
 
@@ -51,6 +51,17 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
+    # Tests run the migrations on a connection of their own.
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     configuration = config.get_section(config.config_ini_section)
     configuration["sqlalchemy.url"] = settings.DATABASE_URL
     connectable = engine_from_config(
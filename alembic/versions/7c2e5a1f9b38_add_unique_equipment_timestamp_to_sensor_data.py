@@ -0,0 +1,34 @@
+"""Add unique equipment/timestamp constraint to sensor_data
+
+Revision ID: 7c2e5a1f9b38
+Revises: 3f1b2c9d7e4a
+Create Date: 2026-10-17 10:04:17.218406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e5a1f9b38'
+down_revision: Union[str, None] = '3f1b2c9d7e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the oldest copy of every duplicated reading so the constraint
+    # can be created.
+    op.execute(
+        'DELETE FROM sensor_data a USING sensor_data b '
+        'WHERE a.equipment_id = b.equipment_id '
+        'AND a.timestamp = b.timestamp '
+        'AND a.id > b.id'
+    )
+    op.create_unique_constraint('unique_equipment_timestamp', 'sensor_data', ['equipment_id', 'timestamp'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('unique_equipment_timestamp', 'sensor_data', type_='unique')
@@ -0,0 +1,55 @@
+"""Bigint sensor_data id, drop redundant id indexes, BRIN on timestamp
+
+Revision ID: a3e9c5b7d2f4
+Revises: f2b6d8a4c1e9
+Create Date: 2026-10-17 19:54:37.820461
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e9c5b7d2f4'
+down_revision: Union[str, None] = 'f2b6d8a4c1e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# B-tree indexes on id columns that duplicate their primary keys.
+REDUNDANT_ID_INDEXES = {
+    'ix_companies_id': 'companies',
+    'ix_equipment_id': 'equipment',
+    'ix_ingestion_checkpoints_id': 'ingestion_checkpoints',
+    'ix_retention_policies_id': 'retention_policies',
+    'ix_sensor_data_id': 'sensor_data',
+    'ix_users_id': 'users',
+}
+
+
+def upgrade() -> None:
+    for index, table in REDUNDANT_ID_INDEXES.items():
+        op.drop_index(index, table_name=table)
+
+    # Identity columns are not supported on partitioned tables before
+    # PostgreSQL 17, so the id stays on its sequence, widened to bigint.
+    # Changing the column type rewrites every partition.
+    op.alter_column('sensor_data', 'id',
+               existing_type=sa.Integer(),
+               type_=sa.BigInteger(),
+               existing_nullable=False)
+    op.execute('ALTER SEQUENCE sensor_data_id_seq AS bigint')
+    op.create_index('ix_sensor_data_timestamp_brin', 'sensor_data', ['timestamp'], unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sensor_data_timestamp_brin', table_name='sensor_data', postgresql_using='brin')
+    op.execute('ALTER SEQUENCE sensor_data_id_seq AS integer')
+    op.alter_column('sensor_data', 'id',
+               existing_type=sa.BigInteger(),
+               type_=sa.Integer(),
+               existing_nullable=False)
+
+    for index, table in REDUNDANT_ID_INDEXES.items():
+        op.create_index(index, table, ['id'], unique=False)
@@ -0,0 +1,26 @@
+"""Add equipment/timestamp/id index to sensor_data
+
+Revision ID: b4d8e2f6a913
+Revises: 7c2e5a1f9b38
+Create Date: 2026-10-17 11:42:05.631920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d8e2f6a913'
+down_revision: Union[str, None] = '7c2e5a1f9b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_sensor_data_equipment_id_timestamp_id', 'sensor_data', ['equipment_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sensor_data_equipment_id_timestamp_id', table_name='sensor_data')
@@ -0,0 +1,99 @@
+"""Partition sensor_data by timestamp
+
+Revision ID: c8f3a2d6e1b7
+Revises: 5d9b1e7c4a62
+Create Date: 2026-10-17 17:21:46.118904
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f3a2d6e1b7'
+down_revision: Union[str, None] = '5d9b1e7c4a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created ahead of the current one; the partition manager keeps
+# extending this at runtime.
+PREMAKE_MONTHS = 3
+
+
+def next_month(start: datetime) -> datetime:
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return timestamp.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def create_constraints() -> None:
+    op.create_foreign_key('sensor_data_equipment_id_fkey', 'sensor_data', 'equipment', ['equipment_id'], ['id'])
+    op.create_unique_constraint('unique_equipment_timestamp', 'sensor_data', ['equipment_id', 'timestamp'])
+    op.create_index('ix_sensor_data_id', 'sensor_data', ['id'], unique=False)
+    op.create_index('ix_sensor_data_equipment_id_timestamp_id', 'sensor_data', ['equipment_id', sa.text('timestamp DESC'), sa.text('id DESC')], unique=False)
+
+
+def upgrade() -> None:
+    # The table is rebuilt as a range-partitioned one with monthly
+    # partitions covering the existing readings, plus a default partition
+    # for anything outside them. Primary and unique keys of a partitioned
+    # table must contain the partition key, so the primary key becomes
+    # (id, timestamp).
+    op.execute('ALTER SEQUENCE sensor_data_id_seq OWNED BY NONE')
+    op.execute(
+        'CREATE TABLE sensor_data_partitioned ('
+        "id integer NOT NULL DEFAULT nextval('sensor_data_id_seq'), "
+        'equipment_id integer NOT NULL, '
+        'timestamp timestamp with time zone NOT NULL, '
+        'value double precision NOT NULL'
+        ') PARTITION BY RANGE (timestamp)'
+    )
+    op.execute('CREATE TABLE sensor_data_default PARTITION OF sensor_data_partitioned DEFAULT')
+
+    first = op.get_bind().scalar(sa.text('SELECT min(timestamp) FROM sensor_data'))
+    now = datetime.now(timezone.utc)
+    start = month_start(min(first, now) if first else now)
+    end = month_start(now)
+    for _ in range(PREMAKE_MONTHS + 1):
+        end = next_month(end)
+    while start < end:
+        op.execute(
+            f'CREATE TABLE sensor_data_p{start:%Y%m%d} PARTITION OF sensor_data_partitioned '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month(start).isoformat()}')"
+        )
+        start = next_month(start)
+
+    op.execute(
+        'INSERT INTO sensor_data_partitioned (id, equipment_id, timestamp, value) '
+        'SELECT id, equipment_id, timestamp, value FROM sensor_data'
+    )
+    op.drop_table('sensor_data')
+    op.rename_table('sensor_data_partitioned', 'sensor_data')
+    op.execute('ALTER SEQUENCE sensor_data_id_seq OWNED BY sensor_data.id')
+    op.create_primary_key('sensor_data_pkey', 'sensor_data', ['id', 'timestamp'])
+    create_constraints()
+
+
+def downgrade() -> None:
+    op.execute('ALTER SEQUENCE sensor_data_id_seq OWNED BY NONE')
+    op.create_table('sensor_data_unpartitioned',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('sensor_data_id_seq')"), nullable=False),
+    sa.Column('equipment_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    )
+    op.execute(
+        'INSERT INTO sensor_data_unpartitioned (id, equipment_id, timestamp, value) '
+        'SELECT id, equipment_id, timestamp, value FROM sensor_data'
+    )
+    # Dropping the partitioned table drops its partitions too.
+    op.drop_table('sensor_data')
+    op.rename_table('sensor_data_unpartitioned', 'sensor_data')
+    op.execute('ALTER SEQUENCE sensor_data_id_seq OWNED BY sensor_data.id')
+    op.create_primary_key('sensor_data_pkey', 'sensor_data', ['id'])
+    create_constraints()
@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta, timezone
+from typing import Literal, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.filters import TimeRange, as_utc
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_rollup import (
+    SensorDataRollupDay,
+    SensorDataRollupHour,
+    SensorDataRollupMinute,
+    SensorDataRollupPending,
+)
+
+BucketInterval = Literal['minute', 'hour', 'day', 'week', 'month']
+
+BUCKET_WIDTHS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=31),
+}
+
+# SQLite has no date_trunc; these strftime formats and modifiers truncate
+# the UTC timestamp text to the same bucket starts, weeks starting Monday.
+# The text matches how SQLAlchemy stores DateTime values on SQLite, so the
+# buckets compare correctly with bound datetimes.
+SQLITE_BUCKETS = {
+    'minute': ('%Y-%m-%d %H:%M:00.000000',),
+    'hour': ('%Y-%m-%d %H:00:00.000000',),
+    'day': ('%Y-%m-%d 00:00:00.000000',),
+    'week': ('%Y-%m-%d 00:00:00.000000', '-6 days', 'weekday 1'),
+    'month': ('%Y-%m-01 00:00:00.000000',),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Pending buckets an aggregation reads around before it gives up on the
+# rollups for the range.
+MAX_PENDING_SPLITS = 100
+
+# Rollup tables by bucket width, coarsest first.
+ROLLUPS = {
+    'day': SensorDataRollupDay,
+    'hour': SensorDataRollupHour,
+    'minute': SensorDataRollupMinute,
+}
+
+
+class Bucket(NamedTuple):
+    start: datetime
+    count: int
+    sum: float
+    avg: float
+    min: float
+    max: float
+
+
+class Aggregation(NamedTuple):
+    source: str
+    buckets: list[Bucket]
+
+
+def bucket_expression(dialect: str, interval: BucketInterval, column):
+    if dialect == 'postgresql':
+        # Truncate in UTC rather than the session time zone so day, week
+        # and month buckets do not depend on the connection settings.
+        return func.date_trunc(interval, column, literal_column("'UTC'"))
+    if dialect == 'sqlite':
+        bucket_format, *modifiers = SQLITE_BUCKETS[interval]
+        return func.strftime(bucket_format, column, *modifiers)
+    return func.date_trunc(interval, column)
+
+
+def check_bucket_count(time_range: TimeRange, interval: BucketInterval):
+    start, end = time_range.utc()
+    buckets = (end - start) / BUCKET_WIDTHS[interval]
+    if buckets > settings.SENSOR_AGGREGATE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f'The range holds more than {settings.SENSOR_AGGREGATE_MAX_BUCKETS} {interval} buckets. Use a shorter range or a wider interval.',
+        )
+
+
+def plan_aggregation(
+    db: Session,
+    equipment_id: int,
+    time_range: TimeRange,
+    interval: BucketInterval,
+) -> list[tuple[type, TimeRange]]:
+    # Splits the range into pieces each read from one table: the widest
+    # rollup no wider than the requested buckets for the part aligned to
+    # its buckets, finer rollups for the unaligned edges and raw readings
+    # for what is left under a minute. Buckets still waiting to be rebuilt
+    # are read from the finer tables the same way, and a range with more of
+    # them than MAX_PENDING_SPLITS from raw readings only.
+    pending = db.scalars(
+        select(SensorDataRollupPending.bucket)
+        .filter(
+            SensorDataRollupPending.equipment_id == equipment_id,
+            SensorDataRollupPending.bucket >= time_range.start,
+            SensorDataRollupPending.bucket < time_range.end,
+        )
+        .limit(MAX_PENDING_SPLITS + 1)
+    ).all()
+    if len(pending) > MAX_PENDING_SPLITS:
+        return [(SensorData, time_range)]
+    return _split_range(
+        TimeRange(*map(_to_datetime, time_range)),
+        [
+            name
+            for name in ROLLUPS
+            if BUCKET_WIDTHS[name] <= BUCKET_WIDTHS[interval]
+        ],
+        [_to_datetime(bucket) for bucket in pending],
+    )
+
+
+def aggregate_sensor_data(
+    db: Session,
+    equipment_id: int,
+    time_range: TimeRange,
+    interval: BucketInterval,
+) -> Aggregation:
+    # One GROUP BY over the range; the database only returns one row per
+    # bucket. Rollups are read instead of raw readings wherever they can
+    # answer the query, so a month of daily buckets reads about 30 rows.
+    # When the range is split, the pieces are combined in the same
+    # statement.
+    dialect = db.get_bind().dialect.name
+    plan = plan_aggregation(db, equipment_id, time_range, interval)
+    parts = [
+        _aggregate_query(dialect, interval, source, equipment_id, piece)
+        for source, piece in plan
+    ]
+    if len(parts) == 1:
+        (query,) = parts
+    else:
+        part = union_all(*parts).subquery()
+        query = select(
+            part.c.bucket,
+            func.sum(part.c.count),
+            func.sum(part.c.sum),
+            func.min(part.c.min),
+            func.max(part.c.max),
+        ).group_by(part.c.bucket)
+    rows = db.execute(query.order_by(query.selected_columns[0])).all()
+
+    sources = {source for source, _ in plan}
+    return Aggregation(
+        # The tables read, widest first.
+        source=','.join(
+            table.__tablename__
+            for table in (*ROLLUPS.values(), SensorData)
+            if table in sources
+        ),
+        buckets=[
+            # SUM over the bigint rollup counts comes back as a numeric.
+            Bucket(
+                _to_datetime(start),
+                int(count),
+                total,
+                total / int(count),
+                low,
+                high,
+            )
+            for start, count, total, low, high in rows
+        ],
+    )
+
+
+def _split_range(
+    time_range: TimeRange, rollups: list[str], pending: list[datetime]
+) -> list[tuple[type, TimeRange]]:
+    if time_range.start >= time_range.end:
+        return []
+    if not rollups:
+        return [(SensorData, time_range)]
+
+    name, *finer = rollups
+    width = BUCKET_WIDTHS[name]
+    start = _ceil_bucket(time_range.start, width)
+    end = _floor_bucket(time_range.end, width)
+    if start >= end:
+        return _split_range(time_range, finer, pending)
+
+    # Runs of buckets holding pending minutes are left to the finer tables.
+    stale = []
+    for bucket in sorted({_floor_bucket(p, width) for p in pending}):
+        if not start <= bucket < end:
+            continue
+        if stale and stale[-1][1] == bucket:
+            stale[-1][1] = bucket + width
+        else:
+            stale.append([bucket, bucket + width])
+
+    pieces = _split_range(TimeRange(time_range.start, start), finer, pending)
+    cursor = start
+    for stale_start, stale_end in stale:
+        if stale_start > cursor:
+            pieces.append((ROLLUPS[name], TimeRange(cursor, stale_start)))
+        pieces += _split_range(
+            TimeRange(stale_start, stale_end), finer, pending
+        )
+        cursor = stale_end
+    if cursor < end:
+        pieces.append((ROLLUPS[name], TimeRange(cursor, end)))
+    pieces += _split_range(TimeRange(end, time_range.end), finer, pending)
+    return pieces
+
+
+def _aggregate_query(
+    dialect: str,
+    interval: BucketInterval,
+    source,
+    equipment_id: int,
+    time_range: TimeRange,
+):
+    if source is SensorData:
+        timestamp = SensorData.timestamp
+        columns = (
+            func.count(SensorData.id),
+            func.sum(SensorData.value),
+            func.min(SensorData.value),
+            func.max(SensorData.value),
+        )
+        filters = time_range.filters(equipment_id)
+    else:
+        timestamp = source.bucket
+        columns = (
+            func.sum(source.count),
+            func.sum(source.sum),
+            func.min(source.min),
+            func.max(source.max),
+        )
+        filters = (
+            source.equipment_id == equipment_id,
+            source.bucket >= time_range.start,
+            source.bucket < time_range.end,
+        )
+
+    bucket = bucket_expression(dialect, interval, timestamp).label('bucket')
+    return (
+        select(
+            bucket,
+            *(
+                column.label(name)
+                for name, column in zip(
+                    ('count', 'sum', 'min', 'max'), columns
+                )
+            ),
+        )
+        .filter(*filters)
+        .group_by(bucket)
+    )
+
+
+def _floor_bucket(bound: datetime, width: timedelta) -> datetime:
+    # Rollup buckets of up to a day start at whole multiples of their width
+    # since the epoch.
+    return bound - (bound - EPOCH) % width
+
+
+def _ceil_bucket(bound: datetime, width: timedelta) -> datetime:
+    floor = _floor_bucket(bound, width)
+    return floor if floor == bound else floor + width
+
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return as_utc(value)
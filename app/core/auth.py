@@ -4,10 +4,12 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models.user import User, user_company
 from app.schemas.user import UserCreate
 
@@ -27,24 +29,10 @@ def get_current_user(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail='Could not validate credentials',
-        headers={'WWW-Authenticate': 'Bearer'},
-    )
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get('sub')
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    email = _get_token_email(credentials)
     user = db.query(User).filter(User.email == email).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
 
@@ -66,3 +54,37 @@ def get_current_admin_user(
             detail="The user doesn't have enough privileges",
         )
     return current_user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    email = _get_token_email(credentials)
+    user = await db.scalar(select(User).filter(User.email == email))
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+def _get_token_email(credentials: HTTPAuthorizationCredentials) -> str:
+    try:
+        payload = jwt.decode(
+            credentials.credentials,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )
+    except JWTError:
+        raise _credentials_exception()
+    email: str = payload.get('sub')
+    if email is None:
+        raise _credentials_exception()
+    return email
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail='Could not validate credentials',
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
@@ -0,0 +1,350 @@
+import io
+from collections import Counter
+from datetime import datetime
+from typing import Literal, Optional
+
+import pandas as pd
+from sqlalchemy import event, func, insert, text, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import DIALECT_INSERTS
+from app.core.hot_cache import stage_readings
+from app.core.rollups import RollupKey, floor_bucket, refresh_rollups
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_count import SensorDataCount
+from app.models.sensor_data_rollup import SensorDataRollupPending
+
+OnDuplicate = Literal['skip', 'update', 'error']
+
+SENSOR_DATA_COLUMNS = ['equipment_id', 'timestamp', 'value']
+UNIQUE_COLUMNS = ['equipment_id', 'timestamp']
+
+# Counter increments made in a session wait here until it commits.
+COUNTS_KEY = 'sensor_data_count_increments'
+
+COPY_SENSOR_DATA_SQL = (
+    'COPY sensor_data (equipment_id, timestamp, value) '
+    'FROM STDIN WITH (FORMAT csv)'
+)
+
+CREATE_STAGING_SQL = (
+    'CREATE TEMP TABLE IF NOT EXISTS sensor_data_staging '
+    '(equipment_id integer, timestamp timestamptz, value double precision)'
+)
+COPY_STAGING_SQL = (
+    'COPY sensor_data_staging (equipment_id, timestamp, value) '
+    'FROM STDIN WITH (FORMAT csv)'
+)
+# Both merges report how many rows were inserted per equipment. For
+# updates, existing rows are rewritten by a sibling UPDATE: it runs on the
+# statement's snapshot, so it never touches the rows inserted next to it.
+# (RETURNING xmax would tell the two apart in one upsert, but PostgreSQL
+# rejects system columns there once sensor_data is partitioned.)
+MERGE_STAGING_SQL = {
+    'skip': (
+        'WITH upserted AS ('
+        'INSERT INTO sensor_data (equipment_id, timestamp, value) '
+        'SELECT equipment_id, timestamp, value FROM sensor_data_staging '
+        'ON CONFLICT (equipment_id, timestamp) DO NOTHING '
+        'RETURNING equipment_id'
+        ') SELECT equipment_id, count(*) FROM upserted GROUP BY equipment_id'
+    ),
+    'update': (
+        'WITH upserted AS ('
+        'INSERT INTO sensor_data (equipment_id, timestamp, value) '
+        'SELECT equipment_id, timestamp, value FROM sensor_data_staging '
+        'ON CONFLICT (equipment_id, timestamp) DO NOTHING '
+        'RETURNING equipment_id'
+        '), updated AS ('
+        'UPDATE sensor_data SET value = staging.value '
+        'FROM sensor_data_staging staging '
+        'WHERE sensor_data.equipment_id = staging.equipment_id '
+        'AND sensor_data.timestamp = staging.timestamp'
+        ') SELECT equipment_id, count(*) FROM upserted GROUP BY equipment_id'
+    ),
+}
+
+
+def write_sensor_data(
+    db: Session, frame: pd.DataFrame, on_duplicate: OnDuplicate = 'skip'
+) -> int:
+    # Rows are written inside the session's transaction; committing is left
+    # to the caller. Returns how many new rows were inserted, so readings
+    # that were skipped or updated as duplicates are len(frame) minus that.
+    if frame.empty:
+        return 0
+
+    if on_duplicate != 'error':
+        # A batch may repeat a key itself; keep the last reading for it.
+        frame = frame.drop_duplicates(UNIQUE_COLUMNS, keep='last')
+
+    inserted = _insert_rows(db, frame, on_duplicate)
+    increment_sensor_counts(db, inserted)
+    keys = set(
+        zip(
+            frame['equipment_id'].tolist(),
+            frame['timestamp'].dt.floor('min').dt.to_pydatetime().tolist(),
+        )
+    )
+    update_rollups(db, keys)
+    stage_readings(db, frame, replace=on_duplicate == 'update')
+    return sum(inserted.values())
+
+
+def increment_sensor_counts(db: Session, counts: dict[int, int]) -> None:
+    # Keeps the per-equipment row counters in step with the inserts made
+    # in the same transaction. The counters are only written as it commits,
+    # so a long load does not hold their row locks, blocking every other
+    # writer of the same equipment, until it ends.
+    pending = db.info.setdefault(COUNTS_KEY, Counter())
+    for equipment_id, count in counts.items():
+        pending[int(equipment_id)] += int(count)
+
+
+def _write_counts(db: Session, counts: dict[int, int]) -> None:
+    counts = {
+        equipment_id: count for equipment_id, count in counts.items() if count
+    }
+    if not counts:
+        return
+
+    # Sorted so concurrent writers lock the counter rows in the same order.
+    dialect = db.get_bind().dialect.name
+    records = [
+        {'equipment_id': equipment_id, 'row_count': count}
+        for equipment_id, count in sorted(counts.items())
+    ]
+    if dialect in DIALECT_INSERTS:
+        statement = DIALECT_INSERTS[dialect](SensorDataCount)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=['equipment_id'],
+                set_={
+                    'row_count': SensorDataCount.row_count
+                    + statement.excluded.row_count
+                },
+            ),
+            records,
+        )
+        return
+
+    for record in records:
+        counter = db.get(SensorDataCount, record['equipment_id'])
+        if counter:
+            counter.row_count += record['row_count']
+        else:
+            db.add(SensorDataCount(**record))
+    db.flush()
+
+
+@event.listens_for(Session, 'before_commit')
+def _apply_counts(session: Session) -> None:
+    counts = session.info.pop(COUNTS_KEY, None)
+    if counts:
+        _write_counts(session, counts)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_counts(session: Session) -> None:
+    session.info.pop(COUNTS_KEY, None)
+
+
+def update_rollups(
+    db: Session, keys: set[RollupKey], inline_buckets: Optional[int] = None
+) -> None:
+    # Marks the touched minute buckets as pending in the same transaction
+    # as the readings. The upsert row-locks each marker, so concurrent
+    # writers of a bucket rebuild it one after the other. Writes of up to
+    # `inline_buckets` buckets rebuild them right away; larger loads leave
+    # them to the background refresher.
+    records = [
+        {'equipment_id': int(equipment_id), 'bucket': bucket}
+        for equipment_id, bucket in sorted(keys)
+    ]
+    if not records:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in DIALECT_INSERTS:
+        statement = DIALECT_INSERTS[dialect](SensorDataRollupPending)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=['equipment_id', 'bucket'],
+                set_={'bucket': statement.excluded.bucket},
+            ),
+            records,
+        )
+    else:
+        for record in records:
+            db.merge(SensorDataRollupPending(**record))
+        db.flush()
+
+    if inline_buckets is None:
+        inline_buckets = settings.SENSOR_ROLLUP_INLINE_BUCKETS
+    if len(records) <= inline_buckets:
+        refresh_rollups(db, keys)
+
+
+def upsert_sensor_reading(
+    db: Session,
+    equipment_id: int,
+    timestamp: datetime,
+    value: float,
+    on_duplicate: OnDuplicate = 'skip',
+) -> tuple[SensorData, bool]:
+    # Returns the stored reading and whether it was newly inserted.
+    if on_duplicate != 'error':
+        dialect = db.get_bind().dialect.name
+        if dialect in DIALECT_INSERTS:
+            statement = (
+                DIALECT_INSERTS[dialect](SensorData)
+                .values(
+                    equipment_id=equipment_id,
+                    timestamp=timestamp,
+                    value=value,
+                )
+                .on_conflict_do_nothing(index_elements=UNIQUE_COLUMNS)
+                .returning(SensorData)
+            )
+            sensor_data = db.scalars(statement).first()
+            if sensor_data:
+                increment_sensor_counts(db, {equipment_id: 1})
+                _update_reading_rollups(db, equipment_id, timestamp)
+                _stage_reading(db, sensor_data)
+                return sensor_data, True
+
+            existing = (
+                db.query(SensorData)
+                .filter(
+                    SensorData.equipment_id == equipment_id,
+                    SensorData.timestamp == timestamp,
+                )
+                .first()
+            )
+            if on_duplicate == 'update':
+                existing.value = value
+                db.flush()
+                _update_reading_rollups(db, equipment_id, timestamp)
+                _stage_reading(db, existing)
+            return existing, False
+
+    sensor_data = SensorData(
+        equipment_id=equipment_id, timestamp=timestamp, value=value
+    )
+    db.add(sensor_data)
+    db.flush()
+    increment_sensor_counts(db, {equipment_id: 1})
+    _update_reading_rollups(db, equipment_id, timestamp)
+    _stage_reading(db, sensor_data)
+    return sensor_data, True
+
+
+def _update_reading_rollups(
+    db: Session, equipment_id: int, timestamp: datetime
+) -> None:
+    # Rebuilding the minute, hour and day of a single reading costs more
+    # statements than the write itself, so unless configured otherwise its
+    # bucket is left to the refresher. Aggregations read pending buckets
+    # from raw readings meanwhile.
+    update_rollups(
+        db,
+        {(equipment_id, floor_bucket(timestamp, 'minute'))},
+        inline_buckets=int(settings.SENSOR_ROLLUP_INLINE_SINGLE_WRITES),
+    )
+
+
+def _stage_reading(db: Session, sensor_data: SensorData) -> None:
+    frame = pd.DataFrame({
+        'equipment_id': [sensor_data.equipment_id],
+        'timestamp': pd.to_datetime([sensor_data.timestamp], utc=True),
+        'value': [sensor_data.value],
+    })
+    stage_readings(db, frame, replace=True)
+
+
+def _insert_rows(
+    db: Session, frame: pd.DataFrame, on_duplicate: OnDuplicate
+) -> dict[int, int]:
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        if on_duplicate == 'error':
+            _copy(db, frame, COPY_SENSOR_DATA_SQL)
+            return _count_by_equipment(frame)
+        return _merge_through_staging(db, frame, on_duplicate)
+
+    records = frame[SENSOR_DATA_COLUMNS].to_dict('records')
+    if on_duplicate == 'error' or dialect not in DIALECT_INSERTS:
+        db.execute(insert(SensorData.__table__), records)
+        return _count_by_equipment(frame)
+
+    existing = _count_existing(db, frame)
+    db.execute(_upsert_statement(dialect, on_duplicate), records)
+    return {
+        equipment_id: count - existing.get(equipment_id, 0)
+        for equipment_id, count in _count_by_equipment(frame).items()
+    }
+
+
+def _upsert_statement(dialect: str, on_duplicate: OnDuplicate):
+    statement = DIALECT_INSERTS[dialect](SensorData.__table__)
+    if on_duplicate == 'update':
+        return statement.on_conflict_do_update(
+            index_elements=UNIQUE_COLUMNS,
+            set_={'value': statement.excluded.value},
+        )
+    return statement.on_conflict_do_nothing(index_elements=UNIQUE_COLUMNS)
+
+
+def _count_by_equipment(frame: pd.DataFrame) -> dict[int, int]:
+    return frame.groupby('equipment_id').size().to_dict()
+
+
+def _count_existing(db: Session, frame: pd.DataFrame) -> dict[int, int]:
+    keys = list(
+        zip(
+            frame['equipment_id'].tolist(),
+            frame['timestamp'].dt.to_pydatetime().tolist(),
+        )
+    )
+    return dict(
+        db.query(SensorData.equipment_id, func.count(SensorData.id))
+        .filter(
+            tuple_(SensorData.equipment_id, SensorData.timestamp).in_(keys)
+        )
+        .group_by(SensorData.equipment_id)
+        .all()
+    )
+
+
+def _merge_through_staging(
+    db: Session, frame: pd.DataFrame, on_duplicate: OnDuplicate
+) -> dict[int, int]:
+    # COPY into a session-local staging table, then merge it with a single
+    # INSERT ... ON CONFLICT so duplicates never abort the load.
+    db.execute(text(CREATE_STAGING_SQL))
+    db.execute(text('TRUNCATE sensor_data_staging'))
+    _copy(db, frame, COPY_STAGING_SQL)
+    return dict(db.execute(text(MERGE_STAGING_SQL[on_duplicate])).all())
+
+
+def _copy(db: Session, frame: pd.DataFrame, sql: str) -> None:
+    buffer = io.StringIO()
+    frame.to_csv(
+        buffer,
+        columns=SENSOR_DATA_COLUMNS,
+        header=False,
+        index=False,
+        date_format='%Y-%m-%dT%H:%M:%S.%f%z',
+    )
+    buffer.seek(0)
+
+    connection = db.connection()
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    except connection.dialect.dbapi.IntegrityError as e:
+        raise IntegrityError(sql, None, e)
+    finally:
+        cursor.close()
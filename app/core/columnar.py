@@ -0,0 +1,127 @@
+import json
+from datetime import datetime, timezone
+from typing import Literal, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Response, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+ColumnarFormat = Literal['arrow', 'parquet', 'columns']
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_MEDIA_TYPE = 'application/vnd.apache.parquet'
+COLUMNAR_JSON_MEDIA_TYPE = 'application/vnd.sensor-data.columns+json'
+
+COLUMNAR_MEDIA_TYPES = {
+    ARROW_STREAM_MEDIA_TYPE: 'arrow',
+    PARQUET_MEDIA_TYPE: 'parquet',
+    'application/x-parquet': 'parquet',
+    COLUMNAR_JSON_MEDIA_TYPE: 'columns',
+}
+RESPONSE_MEDIA_TYPES = {
+    'arrow': ARROW_STREAM_MEDIA_TYPE,
+    'parquet': PARQUET_MEDIA_TYPE,
+    'columns': COLUMNAR_JSON_MEDIA_TYPE,
+}
+JSON_MEDIA_TYPES = ('application/json', 'application/*', '*/*')
+
+# OpenAPI description of the extra representations of a sensor data read.
+COLUMNAR_RESPONSES = {
+    status.HTTP_200_OK: {
+        'content': {
+            ARROW_STREAM_MEDIA_TYPE: {},
+            PARQUET_MEDIA_TYPE: {},
+            COLUMNAR_JSON_MEDIA_TYPE: {},
+        }
+    }
+}
+
+SENSOR_DATA_COLUMNS = ('id', 'equipment_id', 'timestamp', 'value')
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[ColumnarFormat]:
+    # The columnar format the Accept header prefers, or None for the
+    # default row-wise JSON. Media types we do not know are ignored.
+    requested = []
+    for position, media_range in enumerate((accept or '').split(',')):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            requested.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(requested):
+        if media_type in JSON_MEDIA_TYPES:
+            return None
+        if media_type in COLUMNAR_MEDIA_TYPES:
+            return COLUMNAR_MEDIA_TYPES[media_type]
+    return None
+
+
+def read_columns(db: Session, query) -> dict[str, list]:
+    # Streams the (id, equipment_id, timestamp, value) rows of `query`
+    # straight into one list per column, without building a model per row.
+    result = db.execute(
+        query.execution_options(yield_per=settings.SENSOR_STREAM_BATCH_SIZE)
+    )
+    columns = {name: [] for name in SENSOR_DATA_COLUMNS}
+    for rows in result.partitions():
+        for column, values in zip(columns.values(), zip(*rows)):
+            column.extend(values)
+    return columns
+
+
+def columnar_response(
+    columns: dict[str, list],
+    columnar_format: ColumnarFormat,
+    headers: Optional[dict] = None,
+) -> Response:
+    if columnar_format == 'columns':
+        content = json.dumps({
+            **columns,
+            'timestamp': [
+                utc_isoformat(value) for value in columns['timestamp']
+            ],
+        })
+    else:
+        content = _write_arrow(columns, columnar_format)
+    return Response(
+        content=content,
+        media_type=RESPONSE_MEDIA_TYPES[columnar_format],
+        headers=headers,
+    )
+
+
+def utc_isoformat(timestamp: datetime) -> str:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).isoformat()
+
+
+def _write_arrow(
+    columns: dict[str, list], columnar_format: ColumnarFormat
+) -> bytes:
+    table = pa.table({
+        'id': pa.array(columns['id'], pa.int64()),
+        'equipment_id': pa.array(columns['equipment_id'], pa.int64()),
+        'timestamp': pa.array(
+            columns['timestamp'], pa.timestamp('us', tz='UTC')
+        ),
+        'value': pa.array(columns['value'], pa.float64()),
+    })
+    sink = pa.BufferOutputStream()
+    if columnar_format == 'parquet':
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,10 +1,18 @@
 import os
-from typing import Union
+from typing import Optional, Union
 
 from dotenv import load_dotenv
 from fastapi import Query
+from fastapi_pagination import LimitOffsetPage as BaseLimitOffsetPage
 from fastapi_pagination import Page as BasePage
-from fastapi_pagination.customization import CustomizedPage, UseParamsFields
+from fastapi_pagination.cursor import CursorPage as BaseCursorPage
+from fastapi_pagination.customization import (
+    CustomizedPage,
+    UseAdditionalFields,
+    UseExcludedFields,
+    UseFieldsAliases,
+    UseParamsFields,
+)
 from pydantic import PostgresDsn
 from pydantic_settings import BaseSettings
 
@@ -29,6 +37,121 @@ class Settings(BaseSettings):
     FRONTEND_URL: str = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
     DATABASE_URL: Union[str, PostgresDsn]
+    # Comma-separated URLs of read replicas of DATABASE_URL.
+    DATABASE_REPLICA_URLS: str = os.getenv('DATABASE_REPLICA_URLS', '')
+    DATABASE_REPLICA_MAX_LAG_SECONDS: float = float(
+        os.getenv('DATABASE_REPLICA_MAX_LAG_SECONDS', '5')
+    )
+    DATABASE_REPLICA_STICKY_SECONDS: float = float(
+        os.getenv('DATABASE_REPLICA_STICKY_SECONDS', '5')
+    )
+    DATABASE_REPLICA_CHECK_SECONDS: float = float(
+        os.getenv('DATABASE_REPLICA_CHECK_SECONDS', '10')
+    )
+    # Connections of the async engine; async routes wait for one of these
+    # instead of a worker thread.
+    DATABASE_ASYNC_POOL_SIZE: int = int(
+        os.getenv('DATABASE_ASYNC_POOL_SIZE', '20')
+    )
+    DATABASE_ASYNC_MAX_OVERFLOW: int = int(
+        os.getenv('DATABASE_ASYNC_MAX_OVERFLOW', '10')
+    )
+    DATABASE_POOL_TIMEOUT: float = float(
+        os.getenv('DATABASE_POOL_TIMEOUT', '30')
+    )
+
+    CSV_READ_CHUNK_SIZE: int = int(os.getenv('CSV_READ_CHUNK_SIZE', '1048576'))
+    CSV_SNIFF_BYTES: int = int(os.getenv('CSV_SNIFF_BYTES', '65536'))
+    CSV_BATCH_SIZE: int = int(os.getenv('CSV_BATCH_SIZE', '10000'))
+    CSV_COMMIT_ROWS: int = int(os.getenv('CSV_COMMIT_ROWS', '100000'))
+    SENSOR_BATCH_MAX_ITEMS: int = int(
+        os.getenv('SENSOR_BATCH_MAX_ITEMS', '50000')
+    )
+
+    INGESTION_MAX_WORKERS: int = int(os.getenv('INGESTION_MAX_WORKERS', '2'))
+    INGESTION_MAX_PENDING_JOBS: int = int(
+        os.getenv('INGESTION_MAX_PENDING_JOBS', '10')
+    )
+    INGESTION_JOB_TTL_SECONDS: int = int(
+        os.getenv('INGESTION_JOB_TTL_SECONDS', '3600')
+    )
+    INGESTION_SPOOL_DIR: Optional[str] = os.getenv('INGESTION_SPOOL_DIR')
+
+    SENSOR_STREAM_BATCH_SIZE: int = int(
+        os.getenv('SENSOR_STREAM_BATCH_SIZE', '10000')
+    )
+
+    SENSOR_AGGREGATE_MAX_BUCKETS: int = int(
+        os.getenv('SENSOR_AGGREGATE_MAX_BUCKETS', '10000')
+    )
+
+    SENSOR_MULTI_MAX_EQUIPMENT: int = int(
+        os.getenv('SENSOR_MULTI_MAX_EQUIPMENT', '1000')
+    )
+
+    SENSOR_HOT_CACHE_SIZE: int = int(
+        os.getenv('SENSOR_HOT_CACHE_SIZE', '1000')
+    )
+
+    SENSOR_HOT_CACHE_MAX_EQUIPMENT: int = int(
+        os.getenv('SENSOR_HOT_CACHE_MAX_EQUIPMENT', '10000')
+    )
+    SENSOR_HOT_CACHE_TTL_SECONDS: float = float(
+        os.getenv('SENSOR_HOT_CACHE_TTL_SECONDS', '5')
+    )
+
+    SENSOR_PARTITION_INTERVAL: str = os.getenv(
+        'SENSOR_PARTITION_INTERVAL', 'month'
+    )
+
+    SENSOR_PARTITION_PREMAKE: int = int(
+        os.getenv('SENSOR_PARTITION_PREMAKE', '3')
+    )
+
+    SENSOR_PARTITION_CHECK_SECONDS: float = float(
+        os.getenv('SENSOR_PARTITION_CHECK_SECONDS', '3600')
+    )
+
+    SENSOR_PARTITION_DETACH_AFTER_DAYS: int = int(
+        os.getenv('SENSOR_PARTITION_DETACH_AFTER_DAYS', '0')
+    )
+
+    SENSOR_RETENTION_INTERVAL_SECONDS: float = float(
+        os.getenv('SENSOR_RETENTION_INTERVAL_SECONDS', '3600')
+    )
+    SENSOR_RETENTION_BATCH_SIZE: int = int(
+        os.getenv('SENSOR_RETENTION_BATCH_SIZE', '5000')
+    )
+    SENSOR_RETENTION_MAX_BATCHES: int = int(
+        os.getenv('SENSOR_RETENTION_MAX_BATCHES', '200')
+    )
+
+    SENSOR_ROLLUP_INLINE_BUCKETS: int = int(
+        os.getenv('SENSOR_ROLLUP_INLINE_BUCKETS', '1000')
+    )
+    SENSOR_ROLLUP_INLINE_SINGLE_WRITES: bool = (
+        os.getenv('SENSOR_ROLLUP_INLINE_SINGLE_WRITES', 'false').lower()
+        == 'true'
+    )
+    SENSOR_ROLLUP_REFRESH_SECONDS: float = float(
+        os.getenv('SENSOR_ROLLUP_REFRESH_SECONDS', '5')
+    )
+    SENSOR_ROLLUP_REFRESH_BATCH_SIZE: int = int(
+        os.getenv('SENSOR_ROLLUP_REFRESH_BATCH_SIZE', '10000')
+    )
+
+    SENSOR_WRITE_BUFFER_FLUSH_MS: int = int(
+        os.getenv('SENSOR_WRITE_BUFFER_FLUSH_MS', '50')
+    )
+    SENSOR_WRITE_BUFFER_MAX_ROWS: int = int(
+        os.getenv('SENSOR_WRITE_BUFFER_MAX_ROWS', '1000')
+    )
+    SENSOR_WRITE_BUFFER_MAX_PENDING: int = int(
+        os.getenv('SENSOR_WRITE_BUFFER_MAX_PENDING', '100000')
+    )
+    SENSOR_WRITE_BUFFER_ACK_TIMEOUT: float = float(
+        os.getenv('SENSOR_WRITE_BUFFER_ACK_TIMEOUT', '10')
+    )
 
     class Config:
         case_sensitive = True
@@ -43,3 +166,24 @@ Page = CustomizedPage[
         size=Query(settings.DEFAULT_PAGE_SIZE, ge=0),
     ),
 ]
+
+# Keyset pages carry opaque cursors instead of offsets, so fetching a deep
+# page costs the same as fetching the first one.
+CursorPage = CustomizedPage[
+    BaseCursorPage,
+    UseParamsFields(
+        size=Query(50, ge=1, le=100, description='Page size'),
+    ),
+    UseFieldsAliases(
+        next_page='next_cursor',
+        previous_page='previous_cursor',
+    ),
+    UseExcludedFields('total', 'current_page', 'current_page_backwards'),
+]
+
+# The total may come from a cached counter or a planner estimate rather
+# than an exact COUNT(*), and is omitted unless the client asks for it.
+LimitOffsetPage = CustomizedPage[
+    BaseLimitOffsetPage,
+    UseAdditionalFields(total_estimated=(bool, False)),
+]
@@ -1,26 +1,275 @@
+import itertools
 import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from fastapi import Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Dialects whose insert() supports ON CONFLICT clauses.
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Who a primary session writes for, so their next reads stay on the primary.
+CLIENT_KEY = 'client'
+
+# Seconds a replica's replay is behind the primary. A replica that has
+# replayed everything it received counts as current even if the primary
+# has been idle since its last commit.
+REPLICA_LAG_SQL = text(
+    'SELECT CASE '
+    'WHEN NOT pg_is_in_recovery() THEN 0 '
+    'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE coalesce(extract(epoch FROM '
+    'now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+REPLICA_URLS = [
+    url.strip()
+    for url in settings.DATABASE_REPLICA_URLS.split(',')
+    if url.strip()
+]
+
+ASYNC_POOL_OPTIONS = {
+    'pool_size': settings.DATABASE_ASYNC_POOL_SIZE,
+    'max_overflow': settings.DATABASE_ASYNC_MAX_OVERFLOW,
+    'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+}
+
+
+def async_url(url) -> URL:
+    # Query parameters are passed to asyncpg as they are, so libpq-only
+    # ones such as sslmode have to be spelled the asyncpg way (ssl).
+    return make_url(str(url)).set(drivername='postgresql+asyncpg')
+
 
 try:
     engine = create_engine(SQLALCHEMY_DATABASE_URL)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # Replica connections are checked on checkout, so a restarted replica
+    # costs a reconnect rather than a failed request.
+    replica_engines = [
+        create_engine(url, pool_pre_ping=True) for url in REPLICA_URLS
+    ]
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+    # The same databases through asyncpg for the async routes. Their pools
+    # bound how many of those run queries at once.
+    async_engine = create_async_engine(
+        async_url(SQLALCHEMY_DATABASE_URL), **ASYNC_POOL_OPTIONS
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    # Keyed by the replica's sync engine, which the replica router hands out.
+    async_replica_engines = {
+        engine: create_async_engine(
+            async_url(url), pool_pre_ping=True, **ASYNC_POOL_OPTIONS
+        )
+        for engine, url in zip(replica_engines, REPLICA_URLS)
+    }
     Base = declarative_base()
 except Exception as e:
     logger.error(f'Error setting up database connection: {str(e)}')
     raise
 
 
-def get_db():
+@dataclass
+class _Replica:
+    engine: Engine
+    healthy: bool = True
+    lag: float = 0.0
+    checked_at: float = float('-inf')
+
+
+class ReplicaRouter:
+    # Spreads reads over the replicas round robin. A replica is skipped
+    # while it is unreachable or more than `max_lag` seconds behind, and
+    # clients that wrote in the last `sticky` seconds read from the primary
+    # so they see their own writes. With no usable replica reads go to the
+    # primary.
+
+    def __init__(
+        self,
+        engines: list[Engine],
+        max_lag: float,
+        sticky: float,
+        check_interval: float,
+    ):
+        self.max_lag = max_lag
+        self.sticky = sticky
+        self.check_interval = check_interval
+        self._replicas = [_Replica(engine) for engine in engines]
+        self._next = itertools.count()
+        self._writes: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def choose(self, client: Optional[str]) -> Optional[Engine]:
+        if not self._replicas:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            if client and self._writes.get(client, 0) > now:
+                return None
+            start = next(self._next) % len(self._replicas)
+        order = self._replicas[start:] + self._replicas[:start]
+
+        for replica in order:
+            if replica.checked_at + self.check_interval <= now:
+                self._check(replica, now)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def mark_write(self, client: str) -> None:
+        if not self._replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._writes[client] = now + self.sticky
+            self._writes.move_to_end(client)
+            # Every entry has the same window, so the oldest come first.
+            while self._writes and next(iter(self._writes.values())) <= now:
+                self._writes.popitem(last=False)
+
+    def mark_down(self, engine: Engine) -> None:
+        for replica in self._replicas:
+            if replica.engine is engine:
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+                logger.warning(f'Replica {engine.url!r} is unreachable')
+
+    def _check(self, replica: _Replica, now: float) -> None:
+        with self._lock:
+            if replica.checked_at + self.check_interval > now:
+                # Another request is checking it already.
+                return
+            replica.checked_at = now
+
+        try:
+            with replica.engine.connect() as connection:
+                replica.lag = float(connection.scalar(REPLICA_LAG_SQL))
+            replica.healthy = replica.lag <= self.max_lag
+            if not replica.healthy:
+                logger.warning(
+                    f'Replica {replica.engine.url!r} is {replica.lag:.1f}s '
+                    'behind'
+                )
+        except DBAPIError as e:
+            replica.healthy = False
+            logger.warning(
+                f'Replica {replica.engine.url!r} check failed: {str(e)}'
+            )
+
+
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.DATABASE_REPLICA_MAX_LAG_SECONDS,
+    sticky=settings.DATABASE_REPLICA_STICKY_SECONDS,
+    check_interval=settings.DATABASE_REPLICA_CHECK_SECONDS,
+)
+
+
+def get_db(request: Request):
     db = SessionLocal()
+    db.info[CLIENT_KEY] = _client_key(request)
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    # Session for read-only routes: a replica when one is usable for this
+    # client, otherwise the request's primary session.
+    engine = replica_router.choose(_client_key(request))
+    if engine is None:
+        yield db
+        return
+
+    read_db = ReplicaSessionLocal(bind=engine)
+    try:
+        read_db.connection()
+    except DBAPIError:
+        read_db.close()
+        replica_router.mark_down(engine)
+        yield db
+        return
+
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
+async def get_async_db(request: Request):
+    db = AsyncSessionLocal()
+    db.info[CLIENT_KEY] = _client_key(request)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_async_read_db(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+):
+    # Async twin of get_read_db. Replica health checks block, so the
+    # router is only consulted off the event loop, and only when there are
+    # replicas to choose from.
+    engine = None
+    if replica_engines:
+        engine = await run_in_threadpool(
+            replica_router.choose, _client_key(request)
+        )
+    if engine is None:
+        yield db
+        return
+
+    read_db = AsyncSessionLocal(bind=async_replica_engines[engine])
+    try:
+        await read_db.connection()
+    except (DBAPIError, OSError):
+        await read_db.close()
+        replica_router.mark_down(engine)
+        yield db
+        return
+
+    try:
+        yield read_db
+    finally:
+        await read_db.close()
+
+
+def _client_key(request: Request) -> Optional[str]:
+    # Requests are told apart by their credentials; anonymous ones never
+    # need to read their own writes.
+    return request.headers.get('authorization')
+
+
+@event.listens_for(SessionLocal, 'after_commit')
+def _record_write(session: Session) -> None:
+    client = session.info.get(CLIENT_KEY)
+    if client:
+        replica_router.mark_write(client)
@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from typing import Literal
+
+import numpy as np
+from sqlalchemy import Float, cast, extract, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.filters import TimeRange, as_utc
+from app.models.sensor_data import SensorData
+
+DownsampleMethod = Literal['lttb', 'minmax']
+
+# LTTB always keeps the first and last points plus one per bucket.
+MIN_LTTB_POINTS = 3
+# LTTB runs over the per-bucket extremes of this many times as many
+# buckets, so memory stays bounded by `points` rather than by the range.
+LTTB_CANDIDATE_RATIO = 4
+
+
+def epoch_seconds(column):
+    # EXTRACT(epoch ...) on PostgreSQL, STRFTIME('%s', ...) on SQLite.
+    return cast(extract('epoch', column), Float)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the first and last points and,
+    # from every bucket in between, the point forming the largest triangle
+    # with the previously kept point and the average of the next bucket.
+    # Returns the indices of the kept points.
+    size = len(x)
+    if threshold >= size or threshold < MIN_LTTB_POINTS:
+        return np.arange(size)
+
+    every = (size - 2) / (threshold - 2)
+    bounds = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = size - 1
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        if bucket + 2 < len(bounds):
+            next_start, next_end = end, bounds[bucket + 2]
+        else:
+            next_start, next_end = size - 1, size
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_sensor_data(
+    db: Session,
+    equipment_id: int,
+    time_range: TimeRange,
+    points: int,
+    method: DownsampleMethod = 'lttb',
+) -> list[tuple[datetime, float]]:
+    filters = time_range.filters(equipment_id)
+    if method == 'minmax':
+        x, y = _minmax_in_sql(db, filters, time_range, points)
+    else:
+        x, y = _minmax_in_sql(
+            db, filters, time_range, points * LTTB_CANDIDATE_RATIO
+        )
+        indices = lttb(x, y, points)
+        x, y = x[indices], y[indices]
+
+    return [
+        (datetime.fromtimestamp(seconds, timezone.utc), value)
+        for seconds, value in zip(x.tolist(), y.tolist())
+    ]
+
+
+def _minmax_in_sql(
+    db: Session, filters: list, time_range: TimeRange, points: int
+) -> tuple[np.ndarray, ...]:
+    # Every bucket contributes its lowest and highest reading, so the
+    # database returns at most `points` rows whatever the range.
+    start, end = time_range
+    if start is None or end is None:
+        first, last = db.execute(
+            select(
+                func.min(SensorData.timestamp), func.max(SensorData.timestamp)
+            ).filter(*filters)
+        ).one()
+        if first is None:
+            return np.empty(0), np.empty(0)
+        start, end = start or first, end or last
+
+    # Buckets are counted in UTC epoch seconds, as the database does.
+    first, last = as_utc(start).timestamp(), as_utc(end).timestamp()
+    # Nudge the width up so the last reading stays in the final bucket.
+    width = (last - first) / max(points // 2, 1) * (1 + 1e-9) or 1
+
+    seconds = epoch_seconds(SensorData.timestamp)
+
+    bucket = func.floor((seconds - first) / width)
+    ranked = (
+        select(
+            seconds.label('seconds'),
+            SensorData.value,
+            func.row_number()
+            .over(
+                partition_by=bucket,
+                order_by=(SensorData.value, SensorData.timestamp),
+            )
+            .label('lowest'),
+            func.row_number()
+            .over(
+                partition_by=bucket,
+                order_by=(SensorData.value.desc(), SensorData.timestamp),
+            )
+            .label('highest'),
+        )
+        .filter(*filters)
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked.c.seconds, ranked.c.value)
+        .filter(or_(ranked.c.lowest == 1, ranked.c.highest == 1))
+        .order_by(ranked.c.seconds)
+    ).all()
+    if not rows:
+        return np.empty(0), np.empty(0)
+    x, y = zip(*rows)
+    return np.array(x, dtype=np.float64), np.array(y, dtype=np.float64)
@@ -0,0 +1,66 @@
+import csv
+import io
+from typing import Iterator, Literal, Sequence
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.columnar import SENSOR_DATA_COLUMNS, utc_isoformat
+from app.core.config import settings
+from app.core.filters import TimeRange
+from app.core.readings import select_readings
+from app.core.serialization import dumps
+from app.models.sensor_data import SensorData
+
+ExportFormat = Literal['ndjson', 'csv']
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_sensor_data(
+    bind: Engine,
+    equipment_ids: Sequence[int],
+    time_range: TimeRange,
+    export_format: ExportFormat,
+) -> Iterator[bytes]:
+    # Yields the readings of `equipment_ids`, oldest first per equipment,
+    # one chunk per batch. The rows come from a server-side cursor
+    # so memory stays flat however long the history is. The generator owns
+    # its session because it outlives the request's one.
+    query = (
+        select_readings()
+        .filter(SensorData.equipment_id.in_(equipment_ids))
+        .filter(*time_range.bounds())
+        .order_by(SensorData.equipment_id, SensorData.timestamp, SensorData.id)
+        .execution_options(
+            stream_results=True,
+            yield_per=settings.SENSOR_STREAM_BATCH_SIZE,
+        )
+    )
+    with Session(bind=bind, autoflush=False) as db:
+        if export_format == 'csv':
+            yield (','.join(SENSOR_DATA_COLUMNS) + '\r\n').encode('utf-8')
+        for rows in db.execute(query).partitions():
+            if export_format == 'csv':
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(rows)
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (reading_id, equipment_id, utc_isoformat(timestamp), value)
+        for reading_id, equipment_id, timestamp, value in rows
+    )
+    return buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_chunk(rows) -> bytes:
+    return b''.join(
+        dumps(dict(zip(SENSOR_DATA_COLUMNS, row))) + b'\n' for row in rows
+    )
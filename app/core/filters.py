@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from app.models.sensor_data import SensorData
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    # Naive timestamps are taken to be in UTC already.
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+class TimeRange(NamedTuple):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    def utc(self) -> 'TimeRange':
+        return TimeRange(*(bound and as_utc(bound) for bound in self))
+
+    @property
+    def bounded(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    def filters(self, equipment_id: int) -> list:
+        return [SensorData.equipment_id == equipment_id, *self.bounds()]
+
+    def bounds(self) -> list:
+        # start is inclusive and end exclusive, so adjacent ranges never
+        # return the same reading twice.
+        bounds = []
+        if self.start:
+            bounds.append(SensorData.timestamp >= self.start)
+        if self.end:
+            bounds.append(SensorData.timestamp < self.end)
+        return bounds
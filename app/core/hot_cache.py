@@ -0,0 +1,272 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import itemgetter
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.filters import as_utc
+from app.models.sensor_data import SensorData
+
+# Readings written in a session wait here until it commits.
+STAGED_KEY = 'hot_cache_staged'
+STAGED_COLUMNS = ['equipment_id', 'timestamp', 'value']
+
+Reading = tuple[datetime, float]
+
+_timestamp = itemgetter(0)
+
+
+@dataclass
+class HotCacheStats:
+    hits: int = 0
+    misses: int = 0
+    reloads: int = 0
+    evictions: int = 0
+    equipment: int = 0
+    readings: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class _Ring:
+    # The newest readings of one equipment, oldest first. `complete` means
+    # the equipment has no readings older than the ones kept here.
+    readings: list[Reading] = field(default_factory=list)
+    complete: bool = False
+    loading: bool = True
+    loaded_at: float = float('-inf')
+    # Readings committed while the ring was being loaded from the database.
+    applied: list[tuple[datetime, float, bool]] = field(default_factory=list)
+
+
+class HotCache:
+    # Keeps the last `size` readings of up to `max_equipment` equipment in
+    # memory, evicting the least recently read equipment first. Rings are
+    # loaded from the database on first read and then kept current by the
+    # ingestion paths of this process, which hand over their readings once
+    # committed. Writes handled by other processes only show up when a ring
+    # is reloaded, which happens on the first read `ttl` seconds after it
+    # was loaded.
+
+    def __init__(self, size: int, max_equipment: int, ttl: float):
+        self.size = size
+        self.max_equipment = max_equipment
+        self.ttl = ttl
+        self.stats = HotCacheStats()
+        self._rings: OrderedDict[int, _Ring] = OrderedDict()
+        # Users allowed to read an equipment, with when that was checked.
+        self._grants: OrderedDict[tuple[int, int], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recent(
+        self,
+        db: Session,
+        equipment_id: int,
+        limit: int,
+        since: Optional[datetime] = None,
+    ) -> Optional[list[Reading]]:
+        # Up to `limit` readings newest first, only those at or after
+        # `since` if given. Returns None when the ring does not reach back
+        # to `since`, so the caller has to ask the database.
+        with self._lock:
+            ring = self._rings.get(equipment_id)
+            if ring and not ring.loading:
+                if ring.loaded_at + self.ttl > time.monotonic():
+                    self._rings.move_to_end(equipment_id)
+                    self.stats.hits += 1
+                    return _select(ring, limit, since)
+                # Expired: load it again, collecting commits meanwhile.
+                ring.loading = True
+                self.stats.readings -= len(ring.readings)
+                self.stats.reloads += 1
+            else:
+                self.stats.misses += 1
+
+        ring = self._load(db, equipment_id)
+        with self._lock:
+            return _select(ring, limit, since)
+
+    def cached(self, frame: pd.DataFrame) -> pd.DataFrame:
+        # The rows of `frame` for equipment that has a ring.
+        with self._lock:
+            cached = list(self._rings)
+        return frame[frame['equipment_id'].isin(cached)]
+
+    def apply(self, frame: pd.DataFrame, replace: bool) -> None:
+        # Adds committed readings to the rings of cached equipment. Only
+        # the newest `size` readings per equipment can end up in a ring.
+        frame = self.cached(frame)
+        if frame.empty:
+            return
+
+        frame = frame.sort_values('timestamp')
+        for equipment_id, group in frame.groupby('equipment_id'):
+            readings = zip(
+                group['timestamp'].tail(self.size).dt.to_pydatetime(),
+                group['value'].tail(self.size).tolist(),
+            )
+            with self._lock:
+                ring = self._rings.get(int(equipment_id))
+                if ring is None:
+                    continue
+                for timestamp, value in readings:
+                    self._add(ring, as_utc(timestamp), value, replace)
+
+    def granted(self, user_id: int, equipment_id: int) -> bool:
+        # Whether `user_id` was found allowed to read the equipment within
+        # the last `ttl` seconds, so the check can be skipped.
+        with self._lock:
+            checked_at = self._grants.get((user_id, equipment_id))
+        if checked_at is None:
+            return False
+        return checked_at + self.ttl > time.monotonic()
+
+    def grant(self, user_id: int, equipment_id: int) -> None:
+        with self._lock:
+            self._grants[user_id, equipment_id] = time.monotonic()
+            self._grants.move_to_end((user_id, equipment_id))
+            while len(self._grants) > self.max_equipment:
+                self._grants.popitem(last=False)
+
+    def invalidate(self, equipment_ids) -> None:
+        with self._lock:
+            for equipment_id in equipment_ids:
+                ring = self._rings.pop(int(equipment_id), None)
+                if ring:
+                    self.stats.readings -= len(ring.readings)
+            self.stats.equipment = len(self._rings)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rings.clear()
+            self._grants.clear()
+            self.stats.equipment = self.stats.readings = 0
+
+    def _load(self, db: Session, equipment_id: int) -> _Ring:
+        # The ring goes in before the query, so readings committed while
+        # it runs are collected and merged in afterwards.
+        with self._lock:
+            ring = self._rings.setdefault(equipment_id, _Ring())
+            self._evict()
+            self.stats.equipment = len(self._rings)
+
+        rows = db.execute(
+            select(SensorData.timestamp, SensorData.value)
+            .filter(SensorData.equipment_id == equipment_id)
+            .order_by(SensorData.timestamp.desc())
+            .limit(self.size)
+        ).all()
+
+        with self._lock:
+            if not ring.loading:
+                return ring
+            values = {as_utc(timestamp): value for timestamp, value in rows}
+            for timestamp, value, replace in ring.applied:
+                if replace or timestamp not in values:
+                    values[timestamp] = value
+            ring.readings = sorted(values.items())[-self.size :]
+            ring.complete = len(rows) < self.size
+            ring.loading = False
+            ring.loaded_at = time.monotonic()
+            ring.applied = []
+            if self._rings.get(equipment_id) is ring:
+                self.stats.readings += len(ring.readings)
+        return ring
+
+    def _add(
+        self, ring: _Ring, timestamp: datetime, value: float, replace: bool
+    ) -> None:
+        if ring.loading:
+            ring.applied.append((timestamp, value, replace))
+            return
+
+        readings = ring.readings
+        index = bisect_left(readings, timestamp, key=_timestamp)
+        if index < len(readings) and readings[index][0] == timestamp:
+            if replace:
+                readings[index] = (timestamp, value)
+            return
+        if index == 0 and readings and not ring.complete:
+            # Older than anything kept and there may be readings in between.
+            return
+        readings.insert(index, (timestamp, value))
+        if len(readings) > self.size:
+            del readings[0]
+            ring.complete = False
+        else:
+            self.stats.readings += 1
+
+    def _evict(self) -> None:
+        while len(self._rings) > self.max_equipment:
+            _, ring = self._rings.popitem(last=False)
+            self.stats.readings -= len(ring.readings)
+            self.stats.evictions += 1
+
+
+def stage_readings(db: Session, frame: pd.DataFrame, replace: bool) -> None:
+    # Readings only reach the cache once the session commits, so a rolled
+    # back write never shows up in it. Only the newest `size` readings of
+    # equipment cached by now are kept, so a transaction loading a whole
+    # file does not hold on to every row; equipment first read meanwhile
+    # catches up when its ring is reloaded.
+    frame = hot_cache.cached(frame)
+    if frame.empty:
+        return
+
+    frame = frame[STAGED_COLUMNS].assign(replace=replace)
+    staged = db.info.get(STAGED_KEY)
+    if staged is not None:
+        # A reading written again only replaces the staged one on update.
+        frame = pd.concat([staged, frame]).drop_duplicates(
+            ['equipment_id', 'timestamp'], keep='last' if replace else 'first'
+        )
+    db.info[STAGED_KEY] = (
+        frame.sort_values('timestamp')
+        .groupby('equipment_id')
+        .tail(hot_cache.size)
+    )
+
+
+def _select(
+    ring: _Ring, limit: int, since: Optional[datetime]
+) -> Optional[list[Reading]]:
+    readings = ring.readings
+    if since is not None:
+        since = as_utc(since)
+        start = bisect_left(readings, since, key=_timestamp)
+        if start == 0 and not ring.complete and len(readings) < limit:
+            return None
+        readings = readings[start:]
+    return readings[::-1][:limit]
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_staged(session: Session) -> None:
+    staged = session.info.pop(STAGED_KEY, None)
+    if staged is not None:
+        for replace, frame in staged.groupby('replace'):
+            hot_cache.apply(frame, bool(replace))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_staged(session: Session) -> None:
+    session.info.pop(STAGED_KEY, None)
+
+
+hot_cache = HotCache(
+    size=settings.SENSOR_HOT_CACHE_SIZE,
+    max_equipment=settings.SENSOR_HOT_CACHE_MAX_EQUIPMENT,
+    ttl=settings.SENSOR_HOT_CACHE_TTL_SECONDS,
+)
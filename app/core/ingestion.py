@@ -0,0 +1,351 @@
+import codecs
+import csv
+import hashlib
+import io
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+import chardet
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.bulk_writer import OnDuplicate, write_sensor_data
+from app.core.config import settings
+from app.models.equipment import Equipment
+from app.models.ingestion_checkpoint import IngestionCheckpoint
+from app.models.user import user_company
+
+REQUIRED_COLUMNS = ['equipmentId', 'timestamp', 'value']
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
+MAX_REPORTED_ROW_ERRORS = 20
+
+# UTF-32 marks have to be checked before UTF-16 ones, which they start with.
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class IngestionOptions(NamedTuple):
+    resumable: bool = False
+    on_duplicate: OnDuplicate = 'skip'
+
+
+class IngestionResult(NamedTuple):
+    sensors_added: int
+    duplicates: int = 0
+    resumed_from: int = 0
+
+
+class CSVFormat(NamedTuple):
+    encoding: str
+    delimiter: str
+    header: list[str]
+
+
+class EquipmentResolution(NamedTuple):
+    equipment_ids: dict[str, int]
+    missing: set[str]
+    forbidden: set[str]
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> str:
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if sample.startswith(bom):
+            return encoding
+
+    # Valid UTF-8 (which includes plain ASCII) is by far the most common
+    # case, so only fall back to chardet when the sample is not.
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    return chardet.detect(sample)['encoding'] or 'utf-8'
+
+
+def detect_delimiter(file_content: str):
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(file_content)
+        return dialect.delimiter
+    except csv.Error:
+        return ','
+
+
+def hash_file(file: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    file.seek(0)
+    while chunk := file.read(settings.CSV_READ_CHUNK_SIZE):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def sniff_csv(file: BinaryIO) -> CSVFormat:
+    # Encoding, delimiter and header all come from one bounded prefix of
+    # the upload instead of the whole file.
+    file.seek(0)
+    sample = file.read(settings.CSV_SNIFF_BYTES)
+    file.seek(0)
+    complete = len(sample) < settings.CSV_SNIFF_BYTES
+
+    encoding = detect_encoding(sample, complete)
+    text = codecs.getincrementaldecoder(encoding)().decode(
+        sample, final=complete
+    )
+    if not complete and '\n' in text:
+        text = text[: text.rindex('\n')]
+
+    delimiter = detect_delimiter(text)
+    header = next(csv.reader(io.StringIO(text), delimiter=delimiter), [])
+    return CSVFormat(encoding, delimiter, header)
+
+
+def iter_csv_chunks(
+    file: BinaryIO, csv_format: CSVFormat, chunksize: int = None
+) -> Iterator[pd.DataFrame]:
+    chunksize = chunksize or settings.CSV_BATCH_SIZE
+    # The rest of the file is decoded incrementally; a bad byte raises
+    # UnicodeDecodeError as soon as the decoder reaches it.
+    text = io.TextIOWrapper(
+        file, encoding=csv_format.encoding, errors='strict', newline=''
+    )
+    try:
+        # Keep device codes such as "00123" as text instead of letting
+        # pandas infer them as numbers.
+        dtype = {
+            column: str
+            for column in csv_format.header
+            if column.strip() == 'equipmentId'
+        }
+
+        with pd.read_csv(
+            text,
+            delimiter=csv_format.delimiter,
+            chunksize=chunksize,
+            dtype=dtype,
+        ) as reader:
+            for chunk in reader:
+                chunk.columns = chunk.columns.str.strip()
+                yield chunk
+    finally:
+        # Leave the underlying UploadFile open for FastAPI to clean up.
+        text.detach()
+
+
+def format_row_errors(errors: dict[int, str]) -> str:
+    messages = [
+        f'Error processing row {index}: {reason}'
+        for index, reason in sorted(errors.items())[:MAX_REPORTED_ROW_ERRORS]
+    ]
+    if len(errors) > MAX_REPORTED_ROW_ERRORS:
+        messages.append(
+            f'... and {len(errors) - MAX_REPORTED_ROW_ERRORS} more rows'
+        )
+    return '; '.join(messages)
+
+
+def parse_sensor_columns(df: pd.DataFrame) -> pd.DataFrame:
+    raw_timestamps = df['timestamp'].astype('string').str.strip()
+    timestamps = pd.to_datetime(
+        raw_timestamps, format=TIMESTAMP_FORMAT, errors='coerce', utc=True
+    )
+    values = pd.to_numeric(df['value'], errors='coerce').to_numpy(
+        dtype=np.float64
+    )
+
+    invalid_timestamps = timestamps.isna().to_numpy()
+    invalid_values = np.isnan(values)
+
+    if invalid_timestamps.any() or invalid_values.any():
+        errors = {}
+        for index in df.index[invalid_values]:
+            errors[index] = f"invalid value '{df.at[index, 'value']}'"
+        for index in df.index[invalid_timestamps]:
+            errors[index] = f"invalid timestamp '{df.at[index, 'timestamp']}'"
+        raise HTTPException(status_code=400, detail=format_row_errors(errors))
+
+    return pd.DataFrame(
+        {
+            'equipment_code': df['equipmentId'].astype(str).str.strip(),
+            'timestamp': timestamps,
+            'value': values,
+        },
+        index=df.index,
+    )
+
+
+def resolve_equipment(
+    db: Session, user_id: int, equipment_codes: Iterable[str]
+) -> EquipmentResolution:
+    # Two queries per call regardless of how many rows reference the
+    # codes: one IN lookup for the equipment and one for the memberships.
+    codes = set(equipment_codes)
+    if not codes:
+        return EquipmentResolution({}, set(), set())
+
+    rows = (
+        db.query(Equipment.equipment_id, Equipment.id, Equipment.company_id)
+        .filter(Equipment.equipment_id.in_(codes))
+        .order_by(Equipment.id)
+        .all()
+    )
+    company_ids = {row.company_id for row in rows}
+    allowed_companies = {
+        company_id
+        for (company_id,) in db.query(user_company.c.company_id).filter(
+            user_company.c.user_id == user_id,
+            user_company.c.company_id.in_(company_ids),
+        )
+    }
+
+    equipment_ids = {}
+    for row in rows:
+        if (
+            row.company_id in allowed_companies
+            and row.equipment_id not in equipment_ids
+        ):
+            equipment_ids[row.equipment_id] = row.id
+
+    found = {row.equipment_id for row in rows}
+    return EquipmentResolution(
+        equipment_ids=equipment_ids,
+        missing=codes - found,
+        forbidden=found - equipment_ids.keys(),
+    )
+
+
+def raise_for_unresolved(resolution: EquipmentResolution) -> None:
+    if resolution.missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f'Equipment with ID {", ".join(sorted(resolution.missing))} not found',
+        )
+    if resolution.forbidden:
+        raise HTTPException(
+            status_code=403,
+            detail=f"You don't have access to equipment {', '.join(sorted(resolution.forbidden))}",
+        )
+
+
+def get_checkpoint(
+    db: Session, user_id: int, file_hash: str
+) -> IngestionCheckpoint:
+    checkpoint = (
+        db.query(IngestionCheckpoint)
+        .filter(
+            IngestionCheckpoint.user_id == user_id,
+            IngestionCheckpoint.file_hash == file_hash,
+        )
+        .first()
+    )
+    if not checkpoint:
+        checkpoint = IngestionCheckpoint(
+            user_id=user_id, file_hash=file_hash, rows_committed=0
+        )
+        db.add(checkpoint)
+        db.commit()
+    return checkpoint
+
+
+def ingest_csv(
+    db: Session,
+    file: BinaryIO,
+    user_id: int,
+    options: IngestionOptions = IngestionOptions(),
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> IngestionResult:
+    # A resumable load commits every CSV_COMMIT_ROWS rows together with a
+    # checkpoint keyed on the file hash; otherwise the whole file is loaded
+    # in a single transaction.
+    checkpoint = None
+    resumed_from = 0
+    if options.resumable:
+        checkpoint = get_checkpoint(db, user_id, hash_file(file))
+        resumed_from = checkpoint.rows_committed
+        if checkpoint.completed:
+            return IngestionResult(0, resumed_from=resumed_from)
+
+    sensors_added = 0
+    rows_processed = 0
+    uncommitted = 0
+    equipment_ids = {}
+    try:
+        csv_format = sniff_csv(file)
+        for chunk in iter_csv_chunks(file, csv_format):
+            # Rows up to the checkpoint were committed by an earlier attempt;
+            # they are parsed again but never re-validated or re-written.
+            df = chunk[chunk.index >= resumed_from] if resumed_from else chunk
+            if not all(column in df.columns for column in REQUIRED_COLUMNS):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Missing required columns: {', '.join(REQUIRED_COLUMNS)}",
+                )
+
+            frame = parse_sensor_columns(df)
+            if frame.empty:
+                continue
+
+            unresolved = set(frame['equipment_code'].unique()) - set(
+                equipment_ids
+            )
+            if unresolved:
+                resolution = resolve_equipment(db, user_id, unresolved)
+                raise_for_unresolved(resolution)
+                equipment_ids.update(resolution.equipment_ids)
+
+            frame['equipment_id'] = frame['equipment_code'].map(equipment_ids)
+
+            # Flush each chunk as soon as it is built so only one batch of
+            # rows is ever held in memory.
+            sensors_added += write_sensor_data(db, frame, options.on_duplicate)
+            rows_processed += len(frame)
+            uncommitted += len(frame)
+
+            if checkpoint and uncommitted >= settings.CSV_COMMIT_ROWS:
+                checkpoint.rows_committed = int(frame.index[-1]) + 1
+                db.commit()
+                uncommitted = 0
+
+            if on_progress:
+                on_progress(rows_processed)
+
+        if checkpoint:
+            checkpoint.rows_committed = resumed_from + rows_processed
+            checkpoint.completed = True
+        db.commit()
+
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail='The file contains readings that already exist for the same equipment and timestamp.',
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail='Could not decode file content. Please ensure the file is properly encoded.',
+        )
+    except pd.errors.ParserError:
+        raise HTTPException(
+            status_code=400,
+            detail='Error parsing the CSV file. Please check the file format.',
+        )
+
+    return IngestionResult(
+        sensors_added, rows_processed - sensors_added, resumed_from
+    )
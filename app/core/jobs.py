@@ -0,0 +1,195 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from typing import BinaryIO, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import CLIENT_KEY, SessionLocal
+from app.core.ingestion import IngestionOptions, ingest_csv
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+@dataclass
+class IngestionJob:
+    user_id: int
+    filename: str
+    path: str
+    options: IngestionOptions = IngestionOptions()
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JOB_QUEUED
+    rows_processed: int = 0
+    duplicates: int = 0
+    error: Optional[str] = None
+    created_at: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def resumable(self) -> bool:
+        return self.options.resumable
+
+    @property
+    def on_duplicate(self) -> str:
+        return self.options.on_duplicate
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        end = self.finished_at or datetime.now(timezone.utc)
+        elapsed = (end - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else None
+
+
+_jobs: dict[str, IngestionJob] = {}
+_jobs_lock = threading.Lock()
+_executor = ThreadPoolExecutor(
+    max_workers=settings.INGESTION_MAX_WORKERS,
+    thread_name_prefix='ingestion',
+)
+
+
+def submit_csv_job(
+    file: BinaryIO,
+    filename: str,
+    user_id: int,
+    db: Session,
+    options: IngestionOptions = IngestionOptions(),
+) -> IngestionJob:
+    # The job writes through the bind of the request's session, and every
+    # commit it makes keeps the request's client reading from the primary
+    # for a while, as the client's own writes do.
+    with _jobs_lock:
+        _prune_finished_jobs()
+        pending = sum(
+            job.status in {JOB_QUEUED, JOB_RUNNING} for job in _jobs.values()
+        )
+        if pending >= settings.INGESTION_MAX_PENDING_JOBS:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many ingestion jobs in progress. '
+                'Please retry later.',
+            )
+        # Register the job under the same lock as the check so concurrent
+        # uploads cannot all pass it. Only the spool file is created here;
+        # the copy happens outside the lock.
+        spool = tempfile.NamedTemporaryFile(
+            dir=settings.INGESTION_SPOOL_DIR, suffix='.csv', delete=False
+        )
+        job = IngestionJob(
+            user_id=user_id,
+            filename=filename,
+            path=spool.name,
+            options=options,
+        )
+        _jobs[job.id] = job
+
+    try:
+        # The request's spool is deleted once the response is sent, so keep
+        # a copy on disk for the worker.
+        with spool:
+            shutil.copyfileobj(file, spool, settings.CSV_READ_CHUNK_SIZE)
+        future = _executor.submit(
+            _run_job, job, db.get_bind(), db.info.get(CLIENT_KEY)
+        )
+    except Exception:
+        with _jobs_lock:
+            del _jobs[job.id]
+        os.remove(job.path)
+        raise
+
+    future.add_done_callback(partial(_on_job_done, job))
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestionJob]:
+    return _jobs.get(job_id)
+
+
+def list_jobs(user_id: int) -> list[IngestionJob]:
+    with _jobs_lock:
+        return sorted(
+            (job for job in _jobs.values() if job.user_id == user_id),
+            key=lambda job: job.created_at,
+            reverse=True,
+        )
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _on_job_done(job: IngestionJob, future: Future) -> None:
+    # Jobs still queued at shutdown are cancelled without ever running, so
+    # fail them here and remove their spool files.
+    if future.cancelled():
+        job.status = JOB_FAILED
+        job.error = 'The server shut down before the job started.'
+        job.finished_at = datetime.now(timezone.utc)
+        os.remove(job.path)
+
+
+def _prune_finished_jobs() -> None:
+    cutoff = time.time() - settings.INGESTION_JOB_TTL_SECONDS
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at.timestamp() < cutoff:
+            del _jobs[job_id]
+
+
+def _update_progress(job: IngestionJob, rows_processed: int) -> None:
+    job.rows_processed = rows_processed
+
+
+def _run_job(
+    job: IngestionJob, bind: Engine, client: Optional[str] = None
+) -> None:
+    job.status = JOB_RUNNING
+    job.started_at = datetime.now(timezone.utc)
+
+    db = SessionLocal(bind=bind)
+    db.info[CLIENT_KEY] = client
+    try:
+        with open(job.path, 'rb') as file:
+            result = ingest_csv(
+                db,
+                file,
+                job.user_id,
+                job.options,
+                on_progress=lambda rows: _update_progress(job, rows),
+            )
+        job.rows_processed = result.sensors_added + result.duplicates
+        job.duplicates = result.duplicates
+        job.status = JOB_SUCCEEDED
+    except HTTPException as e:
+        db.rollback()
+        job.status = JOB_FAILED
+        job.error = e.detail
+    except Exception as e:
+        db.rollback()
+        logger.error(f'Ingestion job {job.id} failed: {str(e)}')
+        job.status = JOB_FAILED
+        job.error = 'An unexpected error occurred.'
+    finally:
+        db.close()
+        job.finished_at = datetime.now(timezone.utc)
+        os.remove(job.path)
@@ -0,0 +1,259 @@
+import logging
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Literal, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.hot_cache import hot_cache
+
+logger = logging.getLogger(__name__)
+
+PartitionInterval = Literal['day', 'week', 'month']
+
+PARENT_TABLE = 'sensor_data'
+DEFAULT_PARTITION = 'sensor_data_default'
+
+IS_PARTITIONED_SQL = text(
+    'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+    "WHERE partrelid = to_regclass('sensor_data'))"
+)
+LIST_PARTITIONS_SQL = text(
+    'SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) '
+    'FROM pg_inherits '
+    'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+    "WHERE pg_inherits.inhparent = to_regclass('sensor_data') "
+    'ORDER BY child.relname'
+)
+BOUNDS_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: datetime
+    end: datetime
+
+
+def partition_name(start: datetime) -> str:
+    return f'{PARENT_TABLE}_p{start:%Y%m%d}'
+
+
+def floor_partition(timestamp: datetime, interval: PartitionInterval):
+    timestamp = timestamp.astimezone(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if interval == 'month':
+        return timestamp.replace(day=1)
+    if interval == 'week':
+        return timestamp - timedelta(days=timestamp.weekday())
+    return timestamp
+
+
+def next_partition(start: datetime, interval: PartitionInterval):
+    if interval == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if interval == 'week':
+        return start + timedelta(weeks=1)
+    return start + timedelta(days=1)
+
+
+def is_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != 'postgresql':
+        return False
+    return bool(db.scalar(IS_PARTITIONED_SQL))
+
+
+def list_partitions(db: Session) -> list[Partition]:
+    # Range partitions of sensor_data ordered by start; the default
+    # partition is left out.
+    partitions = []
+    for name, bound in db.execute(LIST_PARTITIONS_SQL):
+        match = BOUNDS_PATTERN.search(bound)
+        if match:
+            start, end = (datetime.fromisoformat(b) for b in match.groups())
+            partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def ensure_partitions(
+    db: Session,
+    now: Optional[datetime] = None,
+    interval: PartitionInterval = settings.SENSOR_PARTITION_INTERVAL,
+    ahead: int = settings.SENSOR_PARTITION_PREMAKE,
+) -> list[str]:
+    # Creates the partitions from the newest existing one up to `ahead`
+    # intervals past the current one, so inserts never land in the
+    # default partition in normal operation. Returns the new names.
+    if not is_partitioned(db):
+        return []
+
+    now = now or datetime.now(timezone.utc)
+    target = floor_partition(now, interval)
+    for _ in range(ahead + 1):
+        target = next_partition(target, interval)
+
+    partitions = list_partitions(db)
+    start = (
+        partitions[-1].end if partitions else floor_partition(now, interval)
+    )
+    created = []
+    while start < target:
+        end = next_partition(floor_partition(start, interval), interval)
+        created.append(create_partition(db, start, end))
+        start = end
+    return created
+
+
+def create_partition(db: Session, start: datetime, end: datetime) -> str:
+    # Readings already in the default partition for the range are moved
+    # into the new partition before it is attached.
+    name = partition_name(start)
+    bounds = _bounds(start, end)
+    in_range = {'start': start, 'end': end}
+    stray = db.scalar(
+        text(
+            f'SELECT 1 FROM {DEFAULT_PARTITION} '
+            'WHERE timestamp >= :start AND timestamp < :end LIMIT 1'
+        ),
+        in_range,
+    )
+    if not stray:
+        db.execute(
+            text(f'CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bounds}')
+        )
+        return name
+
+    db.execute(
+        text(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)')
+    )
+    db.execute(
+        text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            'WHERE timestamp >= :start AND timestamp < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ),
+        in_range,
+    )
+    db.execute(
+        text(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bounds}')
+    )
+    return name
+
+
+def detach_partition(db: Session, name: str, drop: bool = False) -> None:
+    # The partition's readings leave sensor_data, so they are taken off
+    # the per-equipment counters and the hot cache. Rollups are kept.
+    equipment_ids = _adjust_counts(db, name, -1)
+    db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}'))
+    if drop:
+        db.execute(text(f'DROP TABLE {name}'))
+    hot_cache.invalidate(equipment_ids)
+
+
+def attach_partition(
+    db: Session, name: str, start: datetime, end: datetime
+) -> None:
+    # Brings a detached partition back, e.g. one restored from an archive.
+    db.execute(
+        text(
+            f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} '
+            f'{_bounds(start, end)}'
+        )
+    )
+    hot_cache.invalidate(_adjust_counts(db, name, 1))
+
+
+def detach_partitions_before(
+    db: Session, cutoff: datetime, drop: bool = False
+) -> list[str]:
+    # Detaches every partition whose whole range is older than `cutoff`.
+    detached = []
+    for partition in list_partitions(db):
+        if partition.end <= cutoff:
+            detach_partition(db, partition.name, drop)
+            detached.append(partition.name)
+    return detached
+
+
+def _bounds(start: datetime, end: datetime) -> str:
+    return f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+
+def _adjust_counts(db: Session, name: str, sign: int) -> list[int]:
+    rows = db.execute(
+        text(
+            'INSERT INTO sensor_data_counts (equipment_id, row_count) '
+            f'SELECT equipment_id, :sign * count(*) FROM {name} '
+            'GROUP BY equipment_id ORDER BY equipment_id '
+            'ON CONFLICT (equipment_id) DO UPDATE '
+            'SET row_count = sensor_data_counts.row_count + excluded.row_count '
+            'RETURNING equipment_id'
+        ),
+        {'sign': sign},
+    )
+    return list(rows.scalars())
+
+
+def maintain_partitions(db: Session) -> tuple[list[str], list[str]]:
+    # One maintenance pass; returns the created and detached partitions.
+    if not is_partitioned(db):
+        return [], []
+    created = ensure_partitions(db)
+    detached = []
+    if settings.SENSOR_PARTITION_DETACH_AFTER_DAYS:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            days=settings.SENSOR_PARTITION_DETACH_AFTER_DAYS
+        )
+        detached = detach_partitions_before(db, cutoff)
+    return created, detached
+
+
+class PartitionMaintainer:
+    # Background thread that keeps partitions created ahead of time and,
+    # when SENSOR_PARTITION_DETACH_AFTER_DAYS is set, detaches old ones.
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(bind,),
+                name='partition-maintainer',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, bind: Engine) -> None:
+        while True:
+            try:
+                with Session(bind=bind, autoflush=False) as db:
+                    created, detached = maintain_partitions(db)
+                    db.commit()
+                if created or detached:
+                    logger.info(
+                        f'Partitions created: {created}, detached: {detached}'
+                    )
+            except Exception as e:
+                logger.error(f'Partition maintenance failed: {str(e)}')
+            if self._stop.wait(self.interval):
+                return
+
+
+partition_maintainer = PartitionMaintainer(
+    interval=settings.SENSOR_PARTITION_CHECK_SECONDS
+)
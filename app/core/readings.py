@@ -0,0 +1,118 @@
+from typing import Sequence
+
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+
+from app.core.filters import TimeRange
+from app.core.serialization import as_dicts
+from app.models.equipment import Equipment
+from app.models.sensor_data import SensorData
+
+
+def select_readings():
+    # The SensorDataOut columns as plain row tuples, without ORM entities.
+    return select(
+        SensorData.id,
+        SensorData.equipment_id,
+        SensorData.timestamp,
+        SensorData.value,
+    )
+
+
+def latest_readings_by_equipment(
+    db: Session,
+    equipment_ids: Sequence[int],
+    time_range: TimeRange,
+    limit: int,
+) -> dict[int, list[dict]]:
+    # The newest `limit` readings of every equipment in one round trip,
+    # grouped by equipment id. Equipment without readings maps to [].
+    query = latest_readings_query(
+        db.get_bind().dialect.name, equipment_ids, time_range, limit
+    )
+    readings = {equipment_id: [] for equipment_id in equipment_ids}
+    for reading in as_dicts(db.execute(query)):
+        readings[reading['equipment_id']].append(reading)
+    return readings
+
+
+def latest_readings_query(
+    dialect: str,
+    equipment_ids: Sequence[int],
+    time_range: TimeRange,
+    limit: int,
+):
+    # Selects (id, equipment_id, timestamp, value) ordered by equipment and
+    # newest first.
+    if dialect == 'postgresql':
+        return _lateral_query(equipment_ids, time_range, limit)
+    return _ranked_query(equipment_ids, time_range, limit)
+
+
+def _lateral_query(
+    equipment_ids: Sequence[int], time_range: TimeRange, limit: int
+):
+    # One LIMIT per equipment through a LATERAL join, so each device is an
+    # index scan on (equipment_id, timestamp DESC, id DESC) that stops
+    # after `limit` rows however much history it has.
+    devices = (
+        select(Equipment.id.label('equipment_id'))
+        .filter(Equipment.id.in_(equipment_ids))
+        .subquery('devices')
+    )
+    latest = (
+        select(SensorData)
+        .filter(
+            SensorData.equipment_id == devices.c.equipment_id,
+            *time_range.bounds(),
+        )
+        .order_by(SensorData.timestamp.desc(), SensorData.id.desc())
+        .limit(limit)
+        .lateral('latest')
+    )
+    return (
+        select(latest)
+        .select_from(devices)
+        .join(latest, true())
+        .order_by(
+            latest.c.equipment_id,
+            latest.c.timestamp.desc(),
+            latest.c.id.desc(),
+        )
+    )
+
+
+def _ranked_query(
+    equipment_ids: Sequence[int], time_range: TimeRange, limit: int
+):
+    # Databases without LATERAL number each equipment's readings with
+    # ROW_NUMBER() and keep the first `limit`.
+    rank = (
+        func.row_number()
+        .over(
+            partition_by=SensorData.equipment_id,
+            order_by=(SensorData.timestamp.desc(), SensorData.id.desc()),
+        )
+        .label('rank')
+    )
+    ranked = (
+        select(SensorData, rank)
+        .filter(
+            SensorData.equipment_id.in_(equipment_ids), *time_range.bounds()
+        )
+        .subquery('ranked')
+    )
+    return (
+        select(
+            ranked.c.id,
+            ranked.c.equipment_id,
+            ranked.c.timestamp,
+            ranked.c.value,
+        )
+        .filter(ranked.c.rank <= limit)
+        .order_by(
+            ranked.c.equipment_id,
+            ranked.c.timestamp.desc(),
+            ranked.c.id.desc(),
+        )
+    )
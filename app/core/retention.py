@@ -0,0 +1,342 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Collection, NamedTuple, Optional
+
+from sqlalchemy import delete, func, or_, select, text, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.aggregation import ROLLUPS
+from app.core.bulk_writer import increment_sensor_counts
+from app.core.config import settings
+from app.core.hot_cache import hot_cache
+from app.core.partitions import (
+    detach_partition,
+    is_partitioned,
+    list_partitions,
+)
+from app.core.rollups import refresh_rollups
+from app.models.equipment import Equipment
+from app.models.retention_policy import RetentionPolicy
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_rollup import SensorDataRollupPending
+
+logger = logging.getLogger(__name__)
+
+# Table size and row estimate, partitions included, from the catalog.
+TABLE_SIZE_SQL = text(
+    'SELECT sum(pg_total_relation_size(c.oid)), sum(greatest(c.reltuples, 0)) '
+    'FROM pg_class c '
+    'WHERE c.oid = to_regclass(:table) OR c.oid IN '
+    '(SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:table))'
+)
+
+
+class RetentionResult(NamedTuple):
+    raw_rows: int
+    rollup_rows: int
+    partitions: list[str]
+
+
+class PolicyReport(NamedTuple):
+    policy_id: int
+    company_id: Optional[int]
+    equipment_id: Optional[int]
+    equipment_count: int
+    raw_rows: int
+    raw_bytes: Optional[int]
+    rollup_rows: int
+    rollup_bytes: Optional[int]
+
+
+def effective_policies(db: Session) -> dict[int, RetentionPolicy]:
+    # The policy of every equipment that has one; an equipment's own policy
+    # overrides its company's.
+    rows = db.execute(
+        select(Equipment.id, RetentionPolicy).join(
+            RetentionPolicy,
+            or_(
+                RetentionPolicy.equipment_id == Equipment.id,
+                RetentionPolicy.company_id == Equipment.company_id,
+            ),
+        )
+    ).all()
+    policies = {}
+    for equipment_id, policy in rows:
+        if policy.equipment_id is not None or equipment_id not in policies:
+            policies[equipment_id] = policy
+    return policies
+
+
+def apply_retention(
+    db: Session, now: Optional[datetime] = None
+) -> RetentionResult:
+    # Deletes raw readings and rollups older than their policy allows.
+    # Whole partitions are dropped when every reading in them has expired;
+    # the rest goes in batches of SENSOR_RETENTION_BATCH_SIZE rows, each
+    # committed on its own so no lock is held for long. A pass stops after
+    # SENSOR_RETENTION_MAX_BATCHES batches and the next one carries on.
+    now = now or datetime.now(timezone.utc)
+    raw_cutoffs = {}
+    rollup_cutoffs = {}
+    for equipment_id, policy in effective_policies(db).items():
+        if policy.raw_days:
+            raw_cutoffs[equipment_id] = now - timedelta(days=policy.raw_days)
+        if policy.rollup_days:
+            rollup_cutoffs[equipment_id] = now - timedelta(
+                days=policy.rollup_days
+            )
+
+    partitions = _drop_expired_partitions(db, raw_cutoffs)
+
+    # Rollups are built from raw readings, so buckets still waiting to be
+    # rebuilt are rebuilt before their readings go. Deleting readings does
+    # not mark their buckets pending: the aggregates are meant to outlive
+    # them.
+    budget = settings.SENSOR_RETENTION_MAX_BATCHES
+    raw_rows = 0
+    for cutoff, equipment_ids in _by_cutoff(raw_cutoffs):
+        _flush_pending_rollups(db, equipment_ids, cutoff)
+        db.commit()
+        deleted, budget = _delete_in_batches(
+            db, SensorData, equipment_ids, cutoff, budget
+        )
+        raw_rows += deleted
+
+    rollup_rows = 0
+    for cutoff, equipment_ids in _by_cutoff(rollup_cutoffs):
+        for rollup in ROLLUPS.values():
+            deleted, budget = _delete_in_batches(
+                db, rollup, equipment_ids, cutoff, budget
+            )
+            rollup_rows += deleted
+    return RetentionResult(raw_rows, rollup_rows, partitions)
+
+
+def retention_report(
+    db: Session,
+    now: Optional[datetime] = None,
+    policy_ids: Optional[Collection[int]] = None,
+) -> list[PolicyReport]:
+    # What apply_retention would delete right now, per policy, for the
+    # given policies or all of them. Bytes are estimated from the table
+    # sizes and row estimates in the catalog, so they are only available on
+    # PostgreSQL.
+    now = now or datetime.now(timezone.utc)
+    raw_row_bytes = _row_bytes(db, SensorData.__tablename__)
+    rollup_row_bytes = {
+        name: _row_bytes(db, rollup.__tablename__)
+        for name, rollup in ROLLUPS.items()
+    }
+    equipment = defaultdict(list)
+    for equipment_id, policy in sorted(effective_policies(db).items()):
+        equipment[policy.id].append(equipment_id)
+
+    query = select(RetentionPolicy).order_by(RetentionPolicy.id)
+    if policy_ids is not None:
+        query = query.where(RetentionPolicy.id.in_(policy_ids))
+
+    reports = []
+    for policy in db.scalars(query):
+        # A company policy overridden for all its equipment covers none.
+        equipment_ids = equipment[policy.id]
+        raw_rows = 0
+        if policy.raw_days:
+            raw_rows = db.scalar(
+                select(func.count()).where(
+                    SensorData.equipment_id.in_(equipment_ids),
+                    SensorData.timestamp
+                    < now - timedelta(days=policy.raw_days),
+                )
+            )
+
+        rollup_rows = {name: 0 for name in ROLLUPS}
+        if policy.rollup_days:
+            for name, rollup in ROLLUPS.items():
+                rollup_rows[name] = db.scalar(
+                    select(func.count()).where(
+                        rollup.equipment_id.in_(equipment_ids),
+                        rollup.bucket
+                        < now - timedelta(days=policy.rollup_days),
+                    )
+                )
+
+        reports.append(
+            PolicyReport(
+                policy_id=policy.id,
+                company_id=policy.company_id,
+                equipment_id=policy.equipment_id,
+                equipment_count=len(equipment_ids),
+                raw_rows=raw_rows,
+                raw_bytes=None
+                if raw_row_bytes is None
+                else int(raw_rows * raw_row_bytes),
+                rollup_rows=sum(rollup_rows.values()),
+                rollup_bytes=None
+                if raw_row_bytes is None
+                else sum(
+                    int(rows * rollup_row_bytes[name])
+                    for name, rows in rollup_rows.items()
+                ),
+            )
+        )
+    return reports
+
+
+def _by_cutoff(cutoffs: dict[int, datetime]):
+    equipment = defaultdict(list)
+    for equipment_id, cutoff in sorted(cutoffs.items()):
+        equipment[cutoff].append(equipment_id)
+    return sorted(equipment.items())
+
+
+def _drop_expired_partitions(
+    db: Session, raw_cutoffs: dict[int, datetime]
+) -> list[str]:
+    # A partition goes as a whole once every equipment with readings in it
+    # has a raw cutoff past the partition's end. Dropping it is a catalog
+    # change instead of a delete of millions of rows.
+    if not raw_cutoffs or not is_partitioned(db):
+        return []
+
+    latest = max(raw_cutoffs.values())
+    dropped = []
+    for partition in list_partitions(db):
+        if partition.end > latest:
+            break
+        expired = [
+            equipment_id
+            for equipment_id, cutoff in raw_cutoffs.items()
+            if cutoff >= partition.end
+        ]
+        kept = db.scalar(
+            text(
+                f'SELECT 1 FROM {partition.name} '
+                'WHERE NOT (equipment_id = ANY(:expired)) LIMIT 1'
+            ),
+            {'expired': expired},
+        )
+        if kept:
+            continue
+        _flush_pending_rollups(db, expired, partition.end)
+        detach_partition(db, partition.name, drop=True)
+        db.commit()
+        dropped.append(partition.name)
+    return dropped
+
+
+def _flush_pending_rollups(
+    db: Session, equipment_ids: list[int], cutoff: datetime
+) -> None:
+    pending = SensorDataRollupPending
+    keys = db.execute(
+        select(pending.equipment_id, pending.bucket).where(
+            pending.equipment_id.in_(equipment_ids),
+            pending.bucket < cutoff,
+        )
+    ).all()
+    refresh_rollups(db, keys)
+
+
+def _delete_in_batches(
+    db: Session,
+    model,
+    equipment_ids: list[int],
+    cutoff: datetime,
+    budget: int,
+) -> tuple[int, int]:
+    # Returns the rows deleted and the batches left in the budget.
+    table = model.__table__
+    if model is SensorData:
+        key = (table.c.id, table.c.timestamp)
+        timestamp = table.c.timestamp
+    else:
+        key = (table.c.equipment_id, table.c.bucket)
+        timestamp = table.c.bucket
+
+    total = 0
+    while budget > 0:
+        batch = (
+            select(*key)
+            .where(table.c.equipment_id.in_(equipment_ids), timestamp < cutoff)
+            .limit(settings.SENSOR_RETENTION_BATCH_SIZE)
+        )
+        deleted = Counter(
+            db.execute(
+                delete(table)
+                .where(tuple_(*key).in_(batch))
+                .returning(table.c.equipment_id)
+            ).scalars()
+        )
+        if model is SensorData:
+            increment_sensor_counts(
+                db, {e: -count for e, count in deleted.items()}
+            )
+        db.commit()
+        if model is SensorData:
+            hot_cache.invalidate(deleted)
+
+        budget -= 1
+        total += deleted.total()
+        if deleted.total() < settings.SENSOR_RETENTION_BATCH_SIZE:
+            break
+    return total, budget
+
+
+def _row_bytes(db: Session, table: str) -> Optional[float]:
+    # Average on-disk bytes per row, indexes included.
+    if db.get_bind().dialect.name != 'postgresql':
+        return None
+    size, rows = db.execute(TABLE_SIZE_SQL, {'table': table}).one()
+    if not rows:
+        # Never analyzed; count the rows instead.
+        rows = db.scalar(text(f'SELECT count(*) FROM {table}'))
+    return float(size) / float(rows) if rows else 0.0
+
+
+class RetentionJob:
+    # Background thread applying the retention policies every `interval`
+    # seconds.
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(bind,),
+                name='retention-job',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, bind: Engine) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(bind=bind, autoflush=False) as db:
+                    result = apply_retention(db)
+                if result.raw_rows or result.rollup_rows or result.partitions:
+                    logger.info(
+                        f'Retention deleted {result.raw_rows} readings, '
+                        f'{result.rollup_rows} rollup rows and partitions '
+                        f'{result.partitions}'
+                    )
+            except Exception as e:
+                logger.error(f'Retention failed: {str(e)}')
+
+
+retention_job = RetentionJob(
+    interval=settings.SENSOR_RETENTION_INTERVAL_SECONDS
+)
@@ -0,0 +1,251 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import (
+    bindparam,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.aggregation import (
+    BUCKET_WIDTHS,
+    EPOCH,
+    ROLLUPS,
+    bucket_expression,
+)
+from app.core.config import settings
+from app.core.database import DIALECT_INSERTS
+from app.core.filters import as_utc
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_rollup import SensorDataRollupPending
+
+logger = logging.getLogger(__name__)
+
+# Each level is rebuilt from the one below it: minutes from raw readings,
+# hours from minutes and days from hours. Buckets of a level closer than
+# the merge gap are recomputed in one range, gap included.
+ROLLUP_LEVELS = (
+    ('minute', SensorData, timedelta(hours=1)),
+    ('hour', ROLLUPS['minute'], timedelta(days=1)),
+    ('day', ROLLUPS['hour'], timedelta(days=7)),
+)
+
+RollupKey = tuple[int, datetime]
+
+# Transaction-level lock on an hour or day bucket of an equipment, keyed by
+# the minutes since the epoch at the bucket start.
+PARENT_LOCK_SQL = text('SELECT pg_advisory_xact_lock(:equipment_id, :bucket)')
+
+
+def floor_bucket(timestamp: datetime, interval: str) -> datetime:
+    timestamp = timestamp.astimezone(timezone.utc)
+    if interval == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if interval == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def refresh_rollups(db: Session, keys: Iterable[RollupKey]) -> None:
+    # Recomputes the minute buckets in `keys` and the hour and day buckets
+    # containing them, then clears their pending markers. Buckets are
+    # rebuilt rather than incremented, so updated values and deleted
+    # readings are reflected too.
+    keys = sorted({(int(e), as_utc(bucket)) for e, bucket in keys})
+    if not keys:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _lock_parent_buckets(db, keys)
+    for interval, source, merge_gap in ROLLUP_LEVELS:
+        target = ROLLUPS[interval].__table__
+        ranges = _merge_ranges(keys, interval, merge_gap)
+        db.execute(
+            delete(target).where(
+                target.c.equipment_id == bindparam('range_equipment_id'),
+                target.c.bucket >= bindparam('range_start'),
+                target.c.bucket < bindparam('range_end'),
+            ),
+            ranges,
+        )
+        db.execute(_rollup_insert(dialect, interval, source), ranges)
+
+    pending = SensorDataRollupPending
+    db.execute(
+        delete(pending).where(
+            tuple_(pending.equipment_id, pending.bucket).in_(keys)
+        )
+    )
+
+
+def refresh_pending_rollups(db: Session, limit: int) -> int:
+    # Claims up to `limit` pending buckets and rebuilds them. On PostgreSQL
+    # buckets still locked by an open ingest transaction are skipped; that
+    # transaction either rebuilds them itself or leaves them for the next
+    # pass.
+    pending = SensorDataRollupPending
+    query = (
+        select(pending.equipment_id, pending.bucket)
+        .order_by(pending.equipment_id, pending.bucket)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    keys = db.execute(query).all()
+    refresh_rollups(db, keys)
+    db.commit()
+    return len(keys)
+
+
+def _lock_parent_buckets(db: Session, keys: list[RollupKey]) -> None:
+    # An hour is rebuilt from its minutes and a day from its hours, so a
+    # rebuild running next to a writer of another minute of the same hour
+    # misses that writer's uncommitted minute, and could overwrite the
+    # writer's own rebuild with that stale sum. Each hour and day is
+    # locked until commit, so its next rebuild starts once the previous
+    # one has committed and sees its minutes. Locks are taken in ascending
+    # order so writers cannot deadlock on them.
+    locks = sorted({
+        (
+            equipment_id,
+            int((floor_bucket(minute, interval) - EPOCH).total_seconds())
+            // 60,
+        )
+        for equipment_id, minute in keys
+        for interval in ('hour', 'day')
+    })
+    for equipment_id, bucket in locks:
+        db.execute(
+            PARENT_LOCK_SQL, {'equipment_id': equipment_id, 'bucket': bucket}
+        )
+
+
+def _rollup_insert(dialect: str, interval: str, source):
+    target = ROLLUPS[interval].__table__
+    columns = ['equipment_id', 'bucket', 'count', 'sum', 'min', 'max']
+    select_rows = _rollup_select(dialect, interval, source)
+    if dialect not in DIALECT_INSERTS:
+        return insert(target).from_select(columns, select_rows)
+
+    # A concurrent rebuild of the same bucket may have inserted it after
+    # the delete above; its row is overwritten with this, newer, result.
+    statement = DIALECT_INSERTS[dialect](target).from_select(
+        columns, select_rows
+    )
+    return statement.on_conflict_do_update(
+        index_elements=['equipment_id', 'bucket'],
+        set_={
+            column: getattr(statement.excluded, column)
+            for column in columns[2:]
+        },
+    )
+
+
+def _rollup_select(dialect: str, interval: str, source):
+    if source is SensorData:
+        timestamp = SensorData.timestamp
+        columns = (
+            func.count(SensorData.id),
+            func.sum(SensorData.value),
+            func.min(SensorData.value),
+            func.max(SensorData.value),
+        )
+    else:
+        timestamp = source.bucket
+        columns = (
+            func.sum(source.count),
+            func.sum(source.sum),
+            func.min(source.min),
+            func.max(source.max),
+        )
+    bucket = bucket_expression(dialect, interval, timestamp)
+    return (
+        select(source.equipment_id, bucket, *columns)
+        .where(
+            source.equipment_id == bindparam('range_equipment_id'),
+            timestamp >= bindparam('range_start'),
+            timestamp < bindparam('range_end'),
+        )
+        .group_by(source.equipment_id, bucket)
+    )
+
+
+def _merge_ranges(
+    keys: list[RollupKey], interval: str, merge_gap: timedelta
+) -> list[dict]:
+    width = BUCKET_WIDTHS[interval]
+    buckets = defaultdict(set)
+    for equipment_id, minute in keys:
+        buckets[equipment_id].add(floor_bucket(minute, interval))
+
+    ranges = []
+    for equipment_id, starts in sorted(buckets.items()):
+        current = None
+        for start in sorted(starts):
+            if current and start - current['range_end'] <= merge_gap:
+                current['range_end'] = start + width
+                continue
+            current = {
+                'range_equipment_id': equipment_id,
+                'range_start': start,
+                'range_end': start + width,
+            }
+            ranges.append(current)
+    return ranges
+
+
+class RollupRefresher:
+    # Background thread that rebuilds buckets left pending by large loads,
+    # late-arriving readings and writers that raced each other.
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(bind,),
+                name='rollup-refresher',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, bind: Engine) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with Session(bind=bind, autoflush=False) as db:
+                    while (
+                        refresh_pending_rollups(db, self.batch_size)
+                        == self.batch_size
+                        and not self._stop.is_set()
+                    ):
+                        pass
+            except Exception as e:
+                logger.error(f'Rollup refresh failed: {str(e)}')
+
+
+rollup_refresher = RollupRefresher(
+    interval=settings.SENSOR_ROLLUP_REFRESH_SECONDS,
+    batch_size=settings.SENSOR_ROLLUP_REFRESH_BATCH_SIZE,
+)
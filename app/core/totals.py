@@ -0,0 +1,65 @@
+import json
+from typing import Literal, NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.filters import TimeRange
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_count import SensorDataCount
+
+TotalMode = Literal['counter', 'estimate', 'exact']
+
+
+class Total(NamedTuple):
+    count: int
+    estimated: bool
+
+
+def count_sensor_data(
+    db: Session,
+    equipment_id: int,
+    mode: TotalMode = 'counter',
+    time_range: TimeRange = TimeRange(),
+) -> Total:
+    # counter reads the row counter the writers keep per equipment, estimate
+    # asks the query planner, and exact runs a full COUNT(*). The counter
+    # covers all of a device's readings, so a time range counts exactly.
+    filters = time_range.filters(equipment_id)
+    if mode == 'estimate' and db.get_bind().dialect.name == 'postgresql':
+        return Total(_estimate_rows(db, filters), estimated=True)
+
+    if mode == 'exact' or time_range.bounded:
+        return Total(_count_rows(db, filters), estimated=False)
+
+    row_count = db.scalar(
+        select(SensorDataCount.row_count).filter(
+            SensorDataCount.equipment_id == equipment_id
+        )
+    )
+    return Total(row_count or 0, estimated=False)
+
+
+def _count_rows(db: Session, filters: list) -> int:
+    return db.scalar(
+        select(func.count()).select_from(SensorData).filter(*filters)
+    )
+
+
+def _estimate_rows(db: Session, filters: list) -> int:
+    connection = db.connection()
+    compiled = (
+        select(SensorData.id)
+        .filter(*filters)
+        .compile(dialect=connection.dialect)
+    )
+    params = compiled.params
+    if compiled.positional:
+        # asyncpg takes $1, $2... rather than named parameters.
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
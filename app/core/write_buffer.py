@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal, Optional
+
+import pandas as pd
+from fastapi import HTTPException, status
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.bulk_writer import OnDuplicate, write_sensor_data
+from app.core.config import settings
+from app.core.database import CLIENT_KEY, replica_router
+
+logger = logging.getLogger(__name__)
+
+WriteMode = Literal['direct', 'buffered', 'fire_and_forget']
+
+
+@dataclass
+class WriteBufferStats:
+    depth: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+    rows_flushed: int = 0
+    last_batch_size: int = 0
+    max_batch_size: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+    total_flush_ms: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.rows_flushed / self.flushes if self.flushes else 0.0
+
+    @property
+    def avg_flush_ms(self) -> float:
+        return self.total_flush_ms / self.flushes if self.flushes else 0.0
+
+
+@dataclass
+class _PendingReading:
+    equipment_id: int
+    timestamp: datetime
+    value: float
+    future: Future
+    client: Optional[str] = None
+
+
+class WriteBuffer:
+    # Coalesces single readings into one multi-row insert per flush. A
+    # flush happens every SENSOR_WRITE_BUFFER_FLUSH_MS or as soon as
+    # SENSOR_WRITE_BUFFER_MAX_ROWS readings are waiting, whichever is first.
+
+    def __init__(self, flush_ms: int, max_rows: int, max_pending: int):
+        self.flush_interval = flush_ms / 1000
+        self.max_rows = max_rows
+        self.max_pending = max_pending
+        self.stats = WriteBufferStats()
+        self._pending = defaultdict(list)
+        self._depth = 0
+        self._first_enqueued_at = None
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    def enqueue(
+        self,
+        db: Session,
+        equipment_id: int,
+        timestamp: datetime,
+        value: float,
+        on_duplicate: OnDuplicate = 'skip',
+    ) -> Future:
+        # The reading is written through the bind of the request's session,
+        # and the request's client reads from the primary for a while after
+        # the write. The returned future resolves once the reading's batch
+        # has been committed, or carries the error that made the flush fail.
+        bind, client = db.get_bind(), db.info.get(CLIENT_KEY)
+        future = Future()
+        with self._condition:
+            if self._depth >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail='Too many readings waiting to be written. Please retry later.',
+                )
+            self._ensure_started()
+            self._pending[(bind, on_duplicate)].append(
+                _PendingReading(equipment_id, timestamp, value, future, client)
+            )
+            self._depth += 1
+            self.stats.depth = self._depth
+            if self._first_enqueued_at is None:
+                self._first_enqueued_at = time.monotonic()
+            self._condition.notify()
+        return future
+
+    def flush(self) -> None:
+        # Serialize flushes, taking the batch only once the previous flush
+        # has committed, so an explicit flush() and the background thread
+        # always commit batches in the order they were enqueued.
+        with self._flush_lock:
+            with self._condition:
+                pending = self._pending
+                self._pending = defaultdict(list)
+                self._depth = 0
+                self.stats.depth = 0
+                self._first_enqueued_at = None
+
+            for (bind, on_duplicate), readings in pending.items():
+                self._write(bind, on_duplicate, readings)
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='write-buffer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and not self._flush_due():
+                    self._condition.wait(self._time_until_due())
+                if self._stopped:
+                    return
+            self.flush()
+
+    def _flush_due(self) -> bool:
+        if self._first_enqueued_at is None:
+            return False
+        return (
+            self._depth >= self.max_rows
+            or time.monotonic() - self._first_enqueued_at
+            >= self.flush_interval
+        )
+
+    def _time_until_due(self) -> Optional[float]:
+        if self._first_enqueued_at is None:
+            return None
+        elapsed = time.monotonic() - self._first_enqueued_at
+        return max(self.flush_interval - elapsed, 0)
+
+    def _write(
+        self,
+        bind: Engine,
+        on_duplicate: OnDuplicate,
+        readings: list[_PendingReading],
+    ) -> None:
+        frame = pd.DataFrame({
+            'equipment_id': [reading.equipment_id for reading in readings],
+            'timestamp': pd.to_datetime(
+                [reading.timestamp for reading in readings], utc=True
+            ),
+            'value': [reading.value for reading in readings],
+        })
+
+        started = time.perf_counter()
+        db = Session(bind=bind, autoflush=False)
+        try:
+            write_sensor_data(db, frame, on_duplicate)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f'Write buffer flush failed: {str(e)}')
+            self.stats.failed_flushes += 1
+            for reading in readings:
+                reading.future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.flushes += 1
+        self.stats.rows_flushed += len(readings)
+        self.stats.last_batch_size = len(readings)
+        self.stats.max_batch_size = max(
+            self.stats.max_batch_size, len(readings)
+        )
+        self.stats.last_flush_ms = elapsed_ms
+        self.stats.max_flush_ms = max(self.stats.max_flush_ms, elapsed_ms)
+        self.stats.total_flush_ms += elapsed_ms
+        for client in {reading.client for reading in readings}:
+            if client:
+                replica_router.mark_write(client)
+        for reading in readings:
+            reading.future.set_result(None)
+
+
+write_buffer = WriteBuffer(
+    flush_ms=settings.SENSOR_WRITE_BUFFER_FLUSH_MS,
+    max_rows=settings.SENSOR_WRITE_BUFFER_MAX_ROWS,
+    max_pending=settings.SENSOR_WRITE_BUFFER_MAX_PENDING,
+)
@@ -5,11 +5,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi_pagination import add_pagination
 from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session
 
+from app.core import jobs
 from app.core.config import settings
-from app.core.database import Base, engine, get_db
-from app.routers import auth, companies, equipment, sensor_data
+from app.core.database import Base, async_engine, engine, get_db
+from app.core.partitions import partition_maintainer
+from app.core.retention import retention_job
+from app.core.rollups import rollup_refresher
+from app.core.write_buffer import write_buffer
+from app.routers import (
+    auth,
+    companies,
+    equipment,
+    ingestion_jobs,
+    metrics,
+    retention,
+    sensor_data,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,6 +46,9 @@ app.include_router(auth.router, prefix=settings.API_V1_STR, tags=['auth'])
 app.include_router(companies.router, prefix=settings.API_V1_STR, tags=['companies'])
 app.include_router(equipment.router, prefix=settings.API_V1_STR, tags=['equipment'])
 app.include_router(sensor_data.router, prefix=settings.API_V1_STR, tags=['sensor_data'])
+app.include_router(ingestion_jobs.router, prefix=settings.API_V1_STR, tags=['ingestion_jobs'])
+app.include_router(metrics.router, prefix=settings.API_V1_STR, tags=['metrics'])
+app.include_router(retention.router, prefix=settings.API_V1_STR, tags=['retention'])
 
 
 @app.get('/health')
@@ -48,6 +65,61 @@ async def health_check(db: Session = Depends(get_db)):
         }
 
 
+@app.on_event('startup')
+def start_rollup_refresher():
+    rollup_refresher.start(engine)
+
+
+@app.on_event('shutdown')
+def stop_rollup_refresher():
+    rollup_refresher.stop()
+
+
+@app.on_event('startup')
+def start_partition_maintainer():
+    partition_maintainer.start(engine)
+
+
+@app.on_event('shutdown')
+def stop_partition_maintainer():
+    partition_maintainer.stop()
+
+
+@app.on_event('startup')
+def start_retention_job():
+    retention_job.start(engine)
+
+
+@app.on_event('shutdown')
+def stop_retention_job():
+    retention_job.stop()
+
+
+@app.on_event('shutdown')
+def shutdown_ingestion_jobs():
+    jobs.shutdown()
+
+
+@app.on_event('shutdown')
+def flush_write_buffer():
+    write_buffer.shutdown()
+
+
+@app.on_event('shutdown')
+async def dispose_async_engine():
+    await async_engine.dispose()
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection stayed busy for DATABASE_POOL_TIMEOUT seconds.
+    return JSONResponse(
+        status_code=503,
+        content={'message': 'The service is busy, please retry.'},
+        headers={'Retry-After': '1'},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f'Global exception: {str(exc)}')
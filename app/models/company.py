@@ -11,7 +11,7 @@ from .user import user_company
 class Company(Base):
     __tablename__ = 'companies'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True, nullable=False)
     address = Column(String)
     created_at = Column(
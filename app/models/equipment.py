@@ -16,7 +16,7 @@ from app.core.database import Base
 class Equipment(Base):
     __tablename__ = 'equipment'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     company_id = Column(Integer, ForeignKey('companies.id'), nullable=False)
     equipment_id = Column(String, index=True, nullable=False)
     name = Column(String)
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+from app.core.database import Base
+
+
+class IngestionCheckpoint(Base):
+    __tablename__ = 'ingestion_checkpoints'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    file_hash = Column(String(64), nullable=False)
+    rows_committed = Column(BigInteger, nullable=False, default=0)
+    completed = Column(Boolean, nullable=False, default=False)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'file_hash', name='unique_user_file_hash'),
+    )
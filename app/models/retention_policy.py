@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer
+
+from app.core.database import Base
+
+
+class RetentionPolicy(Base):
+    # Applies to either a whole company or one equipment; an equipment's
+    # own policy takes precedence over its company's. A NULL number of
+    # days keeps that data forever.
+    __tablename__ = 'retention_policies'
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(
+        Integer, ForeignKey('companies.id'), unique=True, nullable=True
+    )
+    equipment_id = Column(
+        Integer, ForeignKey('equipment.id'), unique=True, nullable=True
+    )
+    raw_days = Column(Integer, nullable=True)
+    rollup_days = Column(Integer, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        CheckConstraint(
+            '(company_id IS NULL) <> (equipment_id IS NULL)',
+            name='ck_retention_policies_scope',
+        ),
+    )
@@ -1,4 +1,13 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -7,9 +16,31 @@ from app.core.database import Base
 class SensorData(Base):
     __tablename__ = 'sensor_data'
 
-    id = Column(Integer, primary_key=True, index=True)
+    # SQLite only autoincrements INTEGER primary keys.
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
     equipment_id = Column(Integer, ForeignKey('equipment.id'), nullable=False)
     timestamp = Column(DateTime(timezone=True), nullable=False)
     value = Column(Float, nullable=False)
 
+    # On PostgreSQL the table is range partitioned on timestamp, which makes
+    # the primary key (id, timestamp) there; see app/core/partitions.py.
+    __table_args__ = (
+        UniqueConstraint(
+            'equipment_id', 'timestamp', name='unique_equipment_timestamp'
+        ),
+        Index(
+            'ix_sensor_data_equipment_id_timestamp_id',
+            'equipment_id',
+            timestamp.desc(),
+            id.desc(),
+        ),
+        # Readings arrive roughly in time order, so a BRIN index answers
+        # time range scans for a fraction of a B-tree's size and upkeep.
+        Index(
+            'ix_sensor_data_timestamp_brin',
+            'timestamp',
+            postgresql_using='brin',
+        ),
+    )
+
     equipment = relationship('Equipment', back_populates='sensor_data')
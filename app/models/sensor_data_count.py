@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+
+from app.core.database import Base
+
+
+class SensorDataCount(Base):
+    __tablename__ = 'sensor_data_counts'
+
+    equipment_id = Column(
+        Integer, ForeignKey('equipment.id'), primary_key=True
+    )
+    row_count = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,46 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+)
+from sqlalchemy.orm import declared_attr
+
+from app.core.database import Base
+
+
+class SensorDataRollupMixin:
+    @declared_attr
+    def equipment_id(cls):
+        return Column(Integer, ForeignKey('equipment.id'), primary_key=True)
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(BigInteger, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+
+
+class SensorDataRollupMinute(SensorDataRollupMixin, Base):
+    __tablename__ = 'sensor_data_rollup_1m'
+
+
+class SensorDataRollupHour(SensorDataRollupMixin, Base):
+    __tablename__ = 'sensor_data_rollup_1h'
+
+
+class SensorDataRollupDay(SensorDataRollupMixin, Base):
+    __tablename__ = 'sensor_data_rollup_1d'
+
+
+class SensorDataRollupPending(Base):
+    # Minute buckets whose raw readings changed since they were last rolled
+    # up. Writers add them in the same transaction as the readings.
+    __tablename__ = 'sensor_data_rollup_pending'
+
+    equipment_id = Column(
+        Integer, ForeignKey('equipment.id'), primary_key=True
+    )
+    bucket = Column(DateTime(timezone=True), primary_key=True)
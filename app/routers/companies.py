@@ -1,43 +1,44 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user_async
 from app.core.config import Page
-from app.core.database import get_db
+from app.core.database import get_async_read_db
+from app.core.serialization import FastJSONResponse
 from app.models.company import Company
 from app.models.user import User, user_company
 from app.schemas.company import CompanyOut
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 
 @router.get('/companies', response_model=Page[CompanyOut])
-def read_companies(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def read_companies(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     query = (
-        db.query(Company)
+        select(Company)
         .join(user_company)
         .filter(user_company.c.user_id == current_user.id)
     )
-    return paginate(query)
+    return await paginate(db, query)
 
 
 @router.get('/companies/{company_id}', response_model=CompanyOut)
-def get_company_by_id(
+async def get_company_by_id(
     company_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    company = (
-        db.query(Company)
+    company = await db.scalar(
+        select(Company)
         .join(user_company)
         .filter(
             Company.id == company_id, user_company.c.user_id == current_user.id
         )
-        .first()
     )
     if not company:
         raise HTTPException(
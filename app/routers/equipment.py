@@ -2,37 +2,38 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.auth import get_current_user
+from app.core.auth import get_current_user_async
 from app.core.config import Page
-from app.core.database import get_db
+from app.core.database import get_async_read_db
+from app.core.serialization import FastJSONResponse
 from app.models.company import Company
 from app.models.equipment import Equipment
 from app.models.user import User, user_company
 from app.schemas.equipment import EquipmentOut
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 
 @router.get('/equipment', response_model=Page[EquipmentOut])
-def read_equipment(
+async def read_equipment(
     company_id: Optional[int] = Query(
         None, description='Filter by company ID'
     ),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
 ):
     if company_id:
         user_company_access = (
-            db.query(user_company)
-            .filter(
-                user_company.c.user_id == current_user.id,
-                user_company.c.company_id == company_id,
+            await db.execute(
+                select(user_company).filter(
+                    user_company.c.user_id == current_user.id,
+                    user_company.c.company_id == company_id,
+                )
             )
-            .first()
-        )
+        ).first()
         if not user_company_access:
             raise HTTPException(
                 status_code=403,
@@ -40,7 +41,7 @@ def read_equipment(
             )
 
     query = (
-        db.query(Equipment)
+        select(Equipment)
         .join(Company, Equipment.company_id == Company.id)
         .join(
             user_company,
@@ -54,7 +55,7 @@ def read_equipment(
     if company_id:
         query = query.filter(Equipment.company_id == company_id)
 
-    result = paginate(query)
+    result = await paginate(db, query)
 
     if not result.items:
         if company_id:
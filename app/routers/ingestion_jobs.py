@@ -0,0 +1,61 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.orm import Session
+
+from app.core import jobs
+from app.core.auth import get_current_admin_user, get_current_user
+from app.core.bulk_writer import OnDuplicate
+from app.core.database import get_db
+from app.core.ingestion import IngestionOptions
+from app.models.user import User
+from app.schemas.ingestion_job import IngestionJobOut
+
+router = APIRouter()
+
+
+@router.post(
+    '/upload-csv/jobs', response_model=IngestionJobOut, status_code=202
+)
+def create_ingestion_job(
+    file: UploadFile = File(...),
+    resumable: bool = Query(
+        False,
+        description='Commit in chunks and resume a previous upload of the same file',
+    ),
+    on_duplicate: OnDuplicate = Query(
+        'skip',
+        description='What to do with readings that already exist for the same equipment and timestamp',
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail='File format not supported. Please upload a CSV file.',
+        )
+
+    return jobs.submit_csv_job(
+        file.file,
+        file.filename,
+        current_user.id,
+        db,
+        IngestionOptions(resumable=resumable, on_duplicate=on_duplicate),
+    )
+
+
+@router.get('/ingestion-jobs', response_model=List[IngestionJobOut])
+def read_ingestion_jobs(current_user: User = Depends(get_current_user)):
+    return jobs.list_jobs(current_user.id)
+
+
+@router.get('/ingestion-jobs/{job_id}', response_model=IngestionJobOut)
+def read_ingestion_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    job = jobs.get_job(job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail='Ingestion job not found')
+    return job
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+
+from app.core.auth import get_current_admin_user
+from app.core.hot_cache import hot_cache
+from app.core.write_buffer import write_buffer
+from app.models.user import User
+from app.schemas.metrics import (
+    HotCacheMetrics,
+    MetricsOut,
+    WriteBufferMetrics,
+)
+
+router = APIRouter()
+
+
+@router.get('/metrics', response_model=MetricsOut)
+def read_metrics(current_user: User = Depends(get_current_admin_user)):
+    return MetricsOut(
+        write_buffer=WriteBufferMetrics.model_validate(write_buffer.stats),
+        hot_cache=HotCacheMetrics.model_validate(hot_cache.stats),
+    )
@@ -0,0 +1,131 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_admin_user
+from app.core.database import get_db
+from app.core.retention import retention_report
+from app.core.serialization import FastJSONResponse
+from app.models.equipment import Equipment
+from app.models.retention_policy import RetentionPolicy
+from app.models.user import User, user_company
+from app.schemas.retention_policy import (
+    RetentionPolicyCreate,
+    RetentionPolicyOut,
+    RetentionReport,
+)
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+
+@router.get('/retention-policies', response_model=List[RetentionPolicyOut])
+def read_retention_policies(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    return _admin_policies(db, current_user).order_by(RetentionPolicy.id).all()
+
+
+@router.post(
+    '/retention-policies', response_model=RetentionPolicyOut, status_code=201
+)
+def create_retention_policy(
+    policy: RetentionPolicyCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    company_id = policy.company_id
+    if policy.equipment_id is not None:
+        equipment = db.get(Equipment, policy.equipment_id)
+        if not equipment:
+            raise HTTPException(status_code=404, detail='Equipment not found')
+        company_id = equipment.company_id
+    _check_company_admin(db, current_user, company_id)
+
+    if policy.company_id is not None:
+        scope = 'company'
+        same_scope = RetentionPolicy.company_id == policy.company_id
+    else:
+        scope = 'equipment'
+        same_scope = RetentionPolicy.equipment_id == policy.equipment_id
+    existing = db.query(RetentionPolicy).filter(same_scope).first()
+    if existing:
+        raise HTTPException(
+            status_code=409,
+            detail=f'Retention policy {existing.id} already covers this {scope}',
+        )
+
+    db_policy = RetentionPolicy(**policy.model_dump())
+    db.add(db_policy)
+    db.commit()
+    db.refresh(db_policy)
+    return db_policy
+
+
+@router.delete('/retention-policies/{policy_id}', status_code=204)
+def delete_retention_policy(
+    policy_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    policy = (
+        _admin_policies(db, current_user)
+        .filter(RetentionPolicy.id == policy_id)
+        .first()
+    )
+    if not policy:
+        raise HTTPException(
+            status_code=404, detail='Retention policy not found'
+        )
+    db.delete(policy)
+    db.commit()
+
+
+@router.get('/retention-policies/report', response_model=List[RetentionReport])
+def read_retention_report(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    # Dry run: what the retention job would delete if it ran now.
+    policy_ids = [
+        policy.id for policy in _admin_policies(db, current_user).all()
+    ]
+    return retention_report(db, policy_ids=policy_ids)
+
+
+def _admin_companies(current_user: User):
+    return select(user_company.c.company_id).where(
+        user_company.c.user_id == current_user.id,
+        user_company.c.role == 'admin',
+    )
+
+
+def _admin_policies(db: Session, current_user: User):
+    # Policies of the companies the user administers and of their
+    # equipment.
+    companies = _admin_companies(current_user)
+    return (
+        db.query(RetentionPolicy)
+        .outerjoin(Equipment, RetentionPolicy.equipment_id == Equipment.id)
+        .filter(
+            or_(
+                RetentionPolicy.company_id.in_(companies),
+                Equipment.company_id.in_(companies),
+            )
+        )
+    )
+
+
+def _check_company_admin(db: Session, current_user: User, company_id: int):
+    admin = db.scalar(
+        _admin_companies(current_user).where(
+            user_company.c.company_id == company_id
+        )
+    )
+    if admin is None:
+        raise HTTPException(
+            status_code=403,
+            detail='User is not an admin of the company',
+        )
@@ -1,39 +1,511 @@
-import csv
-from datetime import datetime
-from io import StringIO
+import json
+from concurrent.futures import TimeoutError
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
 
-import chardet
 import pandas as pd
 from fastapi import (
     APIRouter,
     Body,
     Depends,
     File,
+    Header,
     HTTPException,
     Query,
+    Request,
+    Response,
     UploadFile,
+    status,
 )
-from fastapi_pagination import LimitOffsetPage
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi_pagination.ext.sqlalchemy import paginate
+from pydantic import ValidationError
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_admin_user, get_current_user
-from app.core.database import get_db
+from app.core.aggregation import (
+    BucketInterval,
+    aggregate_sensor_data,
+    check_bucket_count,
+)
+from app.core.auth import (
+    get_current_admin_user,
+    get_current_user,
+    get_current_user_async,
+)
+from app.core.bulk_writer import (
+    OnDuplicate,
+    upsert_sensor_reading,
+    write_sensor_data,
+)
+from app.core.columnar import (
+    COLUMNAR_RESPONSES,
+    ColumnarFormat,
+    columnar_response,
+    negotiate_format,
+    read_columns,
+)
+from app.core.config import CursorPage, LimitOffsetPage, settings
+from app.core.database import (
+    get_async_db,
+    get_async_read_db,
+    get_db,
+    get_read_db,
+)
+from app.core.downsampling import DownsampleMethod, downsample_sensor_data
+from app.core.export import (
+    EXPORT_MEDIA_TYPES,
+    ExportFormat,
+    export_sensor_data,
+)
+from app.core.filters import TimeRange
+from app.core.hot_cache import hot_cache
+from app.core.ingestion import (
+    IngestionOptions,
+    ingest_csv,
+    resolve_equipment,
+)
+from app.core.readings import (
+    latest_readings_by_equipment,
+    latest_readings_query,
+    select_readings,
+)
+from app.core.serialization import FastJSONResponse, as_dicts
+from app.core.totals import TotalMode, count_sensor_data
+from app.core.write_buffer import WriteMode, write_buffer
 from app.models.equipment import Equipment
 from app.models.sensor_data import SensorData as SensorDataModel
 from app.models.user import User, user_company
-from app.schemas.sensor_data import SensorDataBase, SensorDataOut
+from app.schemas.sensor_data import (
+    SensorDataAccepted,
+    SensorDataAggregation,
+    SensorDataBase,
+    SensorDataBatchError,
+    SensorDataBatchResult,
+    SensorDataBucket,
+    SensorDataByEquipment,
+    SensorDataLatest,
+    SensorDataOut,
+    SensorDataPoint,
+    SensorDataRecent,
+    SensorDataSeries,
+)
 
-router = APIRouter()
+NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/ndjson')
 
+# Read routes are async and call the sync helpers in app.core through
+# AsyncSession.run_sync, so they wait for a pooled connection rather than a
+# worker thread. Ingestion and export stay sync: they COPY and stream
+# through psycopg2.
+router = APIRouter(default_response_class=FastJSONResponse)
 
-@router.get('/sensor-data', response_model=LimitOffsetPage[SensorDataOut])
-def read_sensor_data(
-    equipment_id: int = Query(..., description='Filter by equipment ID'),
+
+class SensorPageOptions(NamedTuple):
+    limit: int
+    offset: int
+    include_total: bool
+    total_mode: TotalMode
+    response_format: Optional[ColumnarFormat]
+
+
+class GroupedReadOptions(NamedTuple):
+    limit: int
+    response_format: Optional[ColumnarFormat]
+
+
+class DownsampleOptions(NamedTuple):
+    points: int
+    method: DownsampleMethod
+
+
+class EquipmentSelection(NamedTuple):
+    equipment_ids: list[int]
+    company_id: Optional[int]
+
+
+class SensorWriteOptions(NamedTuple):
+    on_duplicate: OnDuplicate
+    write_mode: WriteMode
+
+
+def get_time_range(
+    start: Optional[datetime] = Query(
+        None, description='Only readings at or after this time'
+    ),
+    end: Optional[datetime] = Query(
+        None, description='Only readings before this time'
+    ),
+) -> TimeRange:
+    # Naive bounds are read as UTC, so they compare with aware ones.
+    time_range = TimeRange(start, end).utc()
+    if start and end and time_range.start >= time_range.end:
+        raise HTTPException(
+            status_code=400, detail='start must be earlier than end'
+        )
+    return time_range
+
+
+def get_equipment_selection(
+    equipment_ids: Optional[List[int]] = Query(
+        None, description='Equipment IDs to read, repeated'
+    ),
+    company_id: Optional[int] = Query(
+        None, description="Read all of this company's equipment"
+    ),
+) -> EquipmentSelection:
+    if bool(equipment_ids) == (company_id is not None):
+        raise HTTPException(
+            status_code=400,
+            detail='Provide either equipment_ids or company_id',
+        )
+    equipment_ids = sorted(set(equipment_ids or []))
+    if len(equipment_ids) > settings.SENSOR_MULTI_MAX_EQUIPMENT:
+        raise HTTPException(
+            status_code=400,
+            detail=f'At most {settings.SENSOR_MULTI_MAX_EQUIPMENT} equipment can be read at once',
+        )
+    return EquipmentSelection(equipment_ids, company_id)
+
+
+def get_response_format(
+    accept: Optional[str] = Header(None),
+) -> Optional[ColumnarFormat]:
+    return negotiate_format(accept)
+
+
+def get_page_options(
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    include_total: bool = Query(
+        True, description='Return the total number of readings'
+    ),
+    total_mode: TotalMode = Query(
+        'counter',
+        description='counter reads the per-equipment row counter, estimate uses the query planner and exact runs COUNT(*)',
+    ),
+    response_format: Optional[ColumnarFormat] = Depends(get_response_format),
+) -> SensorPageOptions:
+    return SensorPageOptions(
+        limit, offset, include_total, total_mode, response_format
+    )
+
+
+def get_grouped_read_options(
+    limit: int = Query(
+        50, ge=1, le=1000, description='Readings returned per equipment'
+    ),
+    response_format: Optional[ColumnarFormat] = Depends(get_response_format),
+) -> GroupedReadOptions:
+    return GroupedReadOptions(limit, response_format)
+
+
+def get_downsample_options(
+    points: int = Query(
+        500, ge=3, le=5000, description='Maximum number of points returned'
+    ),
+    method: DownsampleMethod = Query(
+        'lttb',
+        description='lttb keeps the visually significant points; minmax keeps the lowest and highest reading per time bucket',
+    ),
+) -> DownsampleOptions:
+    return DownsampleOptions(points, method)
+
+
+def get_write_options(
+    on_duplicate: OnDuplicate = Query(
+        'skip',
+        description='What to do with readings that already exist for the same equipment and timestamp',
+    ),
+    write_mode: WriteMode = Query(
+        'direct',
+        description='direct commits the reading in this request; buffered waits for it to be flushed with other readings; fire_and_forget queues it and returns 202',
+    ),
+) -> SensorWriteOptions:
+    return SensorWriteOptions(on_duplicate, write_mode)
+
+
+@router.get(
+    '/sensor-data',
+    response_model=LimitOffsetPage[SensorDataOut],
+    responses=COLUMNAR_RESPONSES,
+)
+async def read_sensor_data(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    time_range: TimeRange = Depends(get_time_range),
+    options: SensorPageOptions = Depends(get_page_options),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    await db.run_sync(_get_readable_equipment, equipment_id, current_user)
+
+    query = (
+        select_readings()
+        .filter(*time_range.filters(equipment_id))
+        .order_by(SensorDataModel.timestamp.desc())
+        .offset(options.offset)
+        .limit(options.limit)
+    )
+
+    total = None
+    if options.include_total:
+        total = await db.run_sync(
+            count_sensor_data, equipment_id, options.total_mode, time_range
+        )
+    if options.response_format:
+        # The page totals travel in headers since the body is just columns.
+        headers = {}
+        if total:
+            headers['X-Total-Count'] = str(total.count)
+            headers['X-Total-Estimated'] = str(total.estimated).lower()
+        return columnar_response(
+            await db.run_sync(read_columns, query),
+            options.response_format,
+            headers,
+        )
+
+    # Same body as LimitOffsetPage[SensorDataOut], built from row tuples.
+    return FastJSONResponse({
+        'items': as_dicts(await db.execute(query)),
+        'total': total.count if total else None,
+        'limit': options.limit,
+        'offset': options.offset,
+        'total_estimated': total.estimated if total else False,
+    })
+
+
+@router.get('/sensor-data/cursor', response_model=CursorPage[SensorDataOut])
+async def read_sensor_data_by_cursor(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    time_range: TimeRange = Depends(get_time_range),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    await db.run_sync(_get_readable_equipment, equipment_id, current_user)
+
+    # The id tie-breaker makes the sort key unique, so each page seeks past
+    # the previous one with WHERE (timestamp, id) < (...) on the
+    # (equipment_id, timestamp DESC, id DESC) index instead of an OFFSET.
+    query = (
+        select(SensorDataModel)
+        .filter(*time_range.filters(equipment_id))
+        .order_by(SensorDataModel.timestamp.desc(), SensorDataModel.id.desc())
+    )
+    return await paginate(db, query)
+
+
+@router.get(
+    '/sensor-data/by-equipment',
+    response_model=SensorDataByEquipment,
+    responses=COLUMNAR_RESPONSES,
+)
+async def read_sensor_data_by_equipment(
+    selection: EquipmentSelection = Depends(get_equipment_selection),
+    time_range: TimeRange = Depends(get_time_range),
+    options: GroupedReadOptions = Depends(get_grouped_read_options),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    equipment_ids = await db.run_sync(
+        _get_readable_equipment_ids, selection, current_user
+    )
+    if options.response_format:
+        # Columnar bodies are flat, ordered by equipment and newest first.
+        query = latest_readings_query(
+            db.get_bind().dialect.name,
+            equipment_ids,
+            time_range,
+            options.limit,
+        )
+        return columnar_response(
+            await db.run_sync(read_columns, query), options.response_format
+        )
+
+    readings = await db.run_sync(
+        latest_readings_by_equipment, equipment_ids, time_range, options.limit
+    )
+    return FastJSONResponse({
+        'groups': [
+            {'equipment_id': equipment_id, 'items': items}
+            for equipment_id, items in readings.items()
+        ]
+    })
+
+
+@router.get(
+    '/sensor-data/export',
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            'content': {
+                media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()
+            }
+        }
+    },
+)
+def export_sensor_data_stream(
+    selection: EquipmentSelection = Depends(get_equipment_selection),
+    time_range: TimeRange = Depends(get_time_range),
+    export_format: ExportFormat = Query('ndjson', alias='format'),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
+    # Streams the full history of the selected equipment instead of
+    # paging through it; access is checked before the first byte is sent.
+    equipment_ids = _get_readable_equipment_ids(db, selection, current_user)
+    return StreamingResponse(
+        export_sensor_data(
+            db.get_bind(), equipment_ids, time_range, export_format
+        ),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="sensor-data.{export_format}"'
+        },
+    )
+
+
+@router.get('/sensor-data/latest', response_model=SensorDataLatest)
+async def read_latest_sensor_data(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    # Rings load from the primary; a ring loaded from a lagging replica
+    # would miss the readings committed in between.
+    await _check_hot_cache_access(db, equipment_id, current_user)
+
+    readings = await db.run_sync(hot_cache.recent, equipment_id, 1)
+    if not readings:
+        raise HTTPException(
+            status_code=404, detail='No readings for this equipment'
+        )
+    ((timestamp, value),) = readings
+    return SensorDataLatest(
+        equipment_id=equipment_id, timestamp=timestamp, value=value
+    )
+
+
+@router.get('/sensor-data/recent', response_model=SensorDataRecent)
+async def read_recent_sensor_data(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    limit: int = Query(
+        50,
+        ge=1,
+        le=settings.SENSOR_HOT_CACHE_SIZE,
+        description='Maximum number of readings returned, newest first',
+    ),
+    seconds: Optional[int] = Query(
+        None, ge=1, description='Only readings from the last seconds'
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    await _check_hot_cache_access(db, equipment_id, current_user)
+
+    since = None
+    if seconds:
+        since = datetime.now(timezone.utc) - timedelta(seconds=seconds)
+    readings = await db.run_sync(hot_cache.recent, equipment_id, limit, since)
+    if readings is None:
+        # The window reaches further back than the cached readings.
+        readings = (
+            await db.execute(
+                select(SensorDataModel.timestamp, SensorDataModel.value)
+                .filter(*TimeRange(since).filters(equipment_id))
+                .order_by(SensorDataModel.timestamp.desc())
+                .limit(limit)
+            )
+        ).all()
+    return SensorDataRecent(
+        equipment_id=equipment_id,
+        points=[
+            SensorDataPoint(timestamp=timestamp, value=value)
+            for timestamp, value in readings
+        ],
+    )
+
+
+async def _check_hot_cache_access(
+    db: AsyncSession, equipment_id: int, current_user: User
+) -> None:
+    # A user's access to an equipment is checked again once the last check
+    # is older than the cache TTL, so cache hits skip those two queries.
+    if not hot_cache.granted(current_user.id, equipment_id):
+        await db.run_sync(_get_readable_equipment, equipment_id, current_user)
+        hot_cache.grant(current_user.id, equipment_id)
+
+
+@router.get('/sensor-data/downsampled', response_model=SensorDataSeries)
+async def read_downsampled_sensor_data(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    time_range: TimeRange = Depends(get_time_range),
+    options: DownsampleOptions = Depends(get_downsample_options),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    await db.run_sync(_get_readable_equipment, equipment_id, current_user)
+
+    readings = await db.run_sync(
+        downsample_sensor_data,
+        equipment_id,
+        time_range,
+        options.points,
+        options.method,
+    )
+    return SensorDataSeries(
+        equipment_id=equipment_id,
+        method=options.method,
+        start=time_range.start,
+        end=time_range.end,
+        points=[
+            SensorDataPoint(timestamp=timestamp, value=value)
+            for timestamp, value in readings
+        ],
+    )
+
+
+@router.get('/sensor-data/aggregate', response_model=SensorDataAggregation)
+async def read_sensor_data_aggregate(
+    equipment_id: int = Query(..., description='Filter by equipment ID'),
+    time_range: TimeRange = Depends(get_time_range),
+    interval: BucketInterval = Query(
+        'hour', description='Width of each aggregation bucket'
+    ),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if time_range.start is None:
+        raise HTTPException(
+            status_code=400, detail='start is required for aggregation'
+        )
+    time_range = TimeRange(
+        time_range.start, time_range.end or datetime.now(timezone.utc)
+    ).utc()
+    check_bucket_count(time_range, interval)
+
+    await db.run_sync(_get_readable_equipment, equipment_id, current_user)
+
+    aggregation = await db.run_sync(
+        aggregate_sensor_data, equipment_id, time_range, interval
+    )
+    return SensorDataAggregation(
+        equipment_id=equipment_id,
+        interval=interval,
+        start=time_range.start,
+        end=time_range.end,
+        source=aggregation.source,
+        buckets=[
+            SensorDataBucket(**bucket._asdict())
+            for bucket in aggregation.buckets
+        ],
+    )
+
+
+def _get_readable_equipment(
+    db: Session, equipment_id: int, current_user: User
+) -> Equipment:
     equipment = (
         db.query(Equipment).filter(Equipment.id == equipment_id).first()
     )
@@ -54,34 +526,80 @@ def read_sensor_data(
             status_code=403,
             detail="User does not have access to this equipment's data",
         )
+    return equipment
 
-    query = db.query(SensorDataModel)
-    query = query.filter(SensorDataModel.equipment_id == equipment_id)
-
-    total = query.count()
-    items = (
-        query.order_by(SensorDataModel.timestamp.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-    return LimitOffsetPage(
-        items=items, total=total, limit=limit, offset=offset
-    )
 
+def _get_readable_equipment_ids(
+    db: Session, selection: EquipmentSelection, current_user: User
+) -> list[int]:
+    # Checks access to the whole selection with one query instead of one
+    # pair of lookups per equipment.
+    if selection.company_id is not None:
+        user_company_relation = (
+            db.query(user_company)
+            .filter(
+                user_company.c.user_id == current_user.id,
+                user_company.c.company_id == selection.company_id,
+            )
+            .first()
+        )
+        if not user_company_relation:
+            raise HTTPException(
+                status_code=403,
+                detail="User does not have access to this company's data",
+            )
+        equipment_ids = db.scalars(
+            select(Equipment.id)
+            .filter(Equipment.company_id == selection.company_id)
+            .order_by(Equipment.id)
+        ).all()
+        if len(equipment_ids) > settings.SENSOR_MULTI_MAX_EQUIPMENT:
+            raise HTTPException(
+                status_code=400,
+                detail=f'The company has more than {settings.SENSOR_MULTI_MAX_EQUIPMENT} equipment. Request them by equipment_ids instead.',
+            )
+        return list(equipment_ids)
 
-def detect_delimiter(file_content: str):
-    sniffer = csv.Sniffer()
-    try:
-        dialect = sniffer.sniff(file_content)
-        return dialect.delimiter
-    except csv.Error:
-        return ','
+    rows = db.execute(
+        select(Equipment.id, user_company.c.user_id)
+        .outerjoin(
+            user_company,
+            and_(
+                user_company.c.company_id == Equipment.company_id,
+                user_company.c.user_id == current_user.id,
+            ),
+        )
+        .filter(Equipment.id.in_(selection.equipment_ids))
+    ).all()
+    found = {equipment_id for equipment_id, _ in rows}
+    missing = [i for i in selection.equipment_ids if i not in found]
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f'Equipment not found: {", ".join(map(str, missing))}',
+        )
+    forbidden = sorted(
+        equipment_id for equipment_id, user_id in rows if user_id is None
+    )
+    if forbidden:
+        raise HTTPException(
+            status_code=403,
+            detail=f"User does not have access to this equipment's data: {', '.join(map(str, forbidden))}",
+        )
+    return selection.equipment_ids
 
 
-@router.post('/sensor-data', response_model=SensorDataOut)
+@router.post(
+    '/sensor-data',
+    response_model=SensorDataOut,
+    responses={
+        status.HTTP_202_ACCEPTED: {'model': SensorDataAccepted},
+    },
+)
 def create_sensor_data(
+    response: Response,
     sensor_data: SensorDataBase = Body(...),
+    options: SensorWriteOptions = Depends(get_write_options),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -112,110 +630,264 @@ def create_sensor_data(
             detail=f"You don't have access to equipment {sensor_data.equipment_id}",
         )
 
-    # Create new sensor data entry
-    new_sensor_data = SensorDataModel(
-        equipment_id=equipment.id,
-        timestamp=sensor_data.timestamp,
-        value=sensor_data.value,
-    )
+    if options.write_mode != 'direct':
+        return _buffer_sensor_data(db, equipment.id, sensor_data, options)
 
-    db.add(new_sensor_data)
-    db.commit()
+    # Create new sensor data entry, or reuse the stored one on a retry
+    try:
+        new_sensor_data, inserted = upsert_sensor_reading(
+            db,
+            equipment.id,
+            sensor_data.timestamp,
+            sensor_data.value,
+            options.on_duplicate,
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail='A reading already exists for this equipment and timestamp',
+        )
     db.refresh(new_sensor_data)
 
+    response.headers['X-Inserted-Count'] = str(int(inserted))
+    response.headers['X-Duplicate-Count'] = str(int(not inserted))
     return new_sensor_data
 
 
-@router.post('/upload-csv/')
-async def upload_csv(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user),
-):
-    if not file.filename.endswith('.csv'):
+def _buffer_sensor_data(
+    db: Session,
+    equipment_id: int,
+    sensor_data: SensorDataBase,
+    options: SensorWriteOptions,
+) -> JSONResponse:
+    if options.on_duplicate == 'error':
         raise HTTPException(
             status_code=400,
-            detail='File format not supported. Please upload a CSV file.',
+            detail='on_duplicate=error is not supported for buffered writes',
         )
 
-    contents = await file.read()
-    result = chardet.detect(contents)
-    file_encoding = (
-        result['encoding'] if result['encoding'] is not None else 'utf-8'
+    future = write_buffer.enqueue(
+        db,
+        equipment_id,
+        sensor_data.timestamp,
+        sensor_data.value,
+        options.on_duplicate,
+    )
+    accepted = SensorDataAccepted(
+        equipment_id=equipment_id,
+        timestamp=sensor_data.timestamp,
+        value=sensor_data.value,
+        status='queued',
     )
+    if options.write_mode == 'fire_and_forget':
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=accepted.model_dump(mode='json'),
+        )
 
     try:
-        decoded_contents = contents.decode(file_encoding)
-        delimiter = detect_delimiter(decoded_contents)
-        df = pd.read_csv(StringIO(decoded_contents), delimiter=delimiter)
-        df.columns = df.columns.str.strip()
+        future.result(timeout=settings.SENSOR_WRITE_BUFFER_ACK_TIMEOUT)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail='Timed out waiting for the reading to be written',
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=500, detail='Failed to write the reading'
+        )
+    accepted.status = 'stored'
+    return JSONResponse(content=accepted.model_dump(mode='json'))
 
-        required_columns = ['equipmentId', 'timestamp', 'value']
-        if not all(column in df.columns for column in required_columns):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {', '.join(required_columns)}",
-            )
 
-        sensor_data_list = []
-        for index, row in df.iterrows():
+async def _iter_ndjson(request: Request):
+    pending = b''
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+async def _iter_batch_items(request: Request):
+    content_type = request.headers.get('content-type', '')
+    if content_type.split(';')[0].strip() in NDJSON_MEDIA_TYPES:
+        async for line in _iter_ndjson(request):
             try:
-                timestamp_dt = datetime.strptime(
-                    row['timestamp'].strip(), '%Y-%m-%dT%H:%M:%S.%f%z'
-                )
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f'Invalid JSON: {e.msg}')
+        return
 
-                equipment = (
-                    db.query(Equipment)
-                    .filter(Equipment.equipment_id == row['equipmentId'])
-                    .first()
-                )
-                if not equipment:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Equipment with ID {row['equipmentId']} not found",
-                    )
-
-                user_company_relation = (
-                    db.query(user_company)
-                    .filter(
-                        user_company.c.user_id == current_user.id,
-                        user_company.c.company_id == equipment.company_id,
-                    )
-                    .first()
+    try:
+        items = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail='Invalid JSON body')
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=400, detail='Expected a JSON array of readings'
+        )
+    for item in items:
+        yield item
+
+
+@router.post(
+    '/sensor-data/batch',
+    response_model=SensorDataBatchResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'application/json': {
+                    'schema': {
+                        'type': 'array',
+                        'items': {
+                            '$ref': '#/components/schemas/SensorDataBase'
+                        },
+                    }
+                },
+                'application/x-ndjson': {'schema': {'type': 'string'}},
+            },
+        }
+    },
+)
+async def create_sensor_data_batch(
+    request: Request,
+    on_duplicate: OnDuplicate = Query(
+        'skip',
+        description='What to do with readings that already exist for the same equipment and timestamp',
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    readings = []
+    errors = []
+    async for item in _iter_batch_items(request):
+        index = len(readings) + len(errors)
+        if index >= settings.SENSOR_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f'A batch can hold at most {settings.SENSOR_BATCH_MAX_ITEMS} readings',
+            )
+        if isinstance(item, ValueError):
+            errors.append(SensorDataBatchError(index=index, detail=str(item)))
+            continue
+        try:
+            readings.append((index, SensorDataBase.model_validate(item)))
+        except ValidationError as e:
+            errors.append(
+                SensorDataBatchError(
+                    index=index,
+                    detail='; '.join(
+                        f"{'.'.join(map(str, error['loc'])) or 'body'}: {error['msg']}"
+                        for error in e.errors()
+                    ),
                 )
-                if not user_company_relation:
-                    raise HTTPException(
-                        status_code=403,
-                        detail=f"You don't have access to equipment {row['equipmentId']}",
-                    )
-
-                sensor_data = SensorDataModel(
-                    equipment_id=equipment.id,
-                    timestamp=timestamp_dt,
-                    value=float(row['value']),
+            )
+
+    # Resolving, writing and committing block on the database, so they run
+    # in the thread pool instead of the event loop.
+    return await run_in_threadpool(
+        _write_batch, db, current_user.id, readings, errors, on_duplicate
+    )
+
+
+def _write_batch(
+    db: Session,
+    user_id: int,
+    readings: list[tuple[int, SensorDataBase]],
+    errors: list[SensorDataBatchError],
+    on_duplicate: OnDuplicate,
+) -> SensorDataBatchResult:
+    resolution = resolve_equipment(
+        db, user_id, {reading.equipment_id for _, reading in readings}
+    )
+
+    accepted = []
+    for index, reading in readings:
+        if reading.equipment_id in resolution.missing:
+            errors.append(
+                SensorDataBatchError(
+                    index=index,
+                    detail=f'Equipment with ID {reading.equipment_id} not found',
                 )
-                sensor_data_list.append(sensor_data)
-            except ValueError as ve:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f'Error processing row {index}: {str(ve)}',
+            )
+        elif reading.equipment_id in resolution.forbidden:
+            errors.append(
+                SensorDataBatchError(
+                    index=index,
+                    detail=f"You don't have access to equipment {reading.equipment_id}",
                 )
+            )
+        else:
+            accepted.append(reading)
 
-        db.bulk_save_objects(sensor_data_list)
+    frame = pd.DataFrame({
+        'equipment_id': [
+            resolution.equipment_ids[reading.equipment_id]
+            for reading in accepted
+        ],
+        'timestamp': pd.to_datetime(
+            [reading.timestamp for reading in accepted], utc=True
+        ),
+        'value': [reading.value for reading in accepted],
+    })
+    try:
+        inserted = write_sensor_data(db, frame, on_duplicate)
         db.commit()
-
-    except UnicodeDecodeError:
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(
-            status_code=400,
-            detail='Could not decode file content. Please ensure the file is properly encoded.',
+            status_code=409,
+            detail='The batch contains readings that already exist for the same equipment and timestamp.',
         )
-    except pd.errors.ParserError:
+
+    return SensorDataBatchResult(
+        accepted=len(accepted),
+        inserted=inserted,
+        duplicates=len(accepted) - inserted,
+        rejected=len(errors),
+        errors=sorted(errors, key=lambda error: error.index),
+    )
+
+
+@router.post('/upload-csv/')
+def upload_csv(
+    file: UploadFile = File(...),
+    resumable: bool = Query(
+        False,
+        description='Commit in chunks and resume a previous upload of the same file',
+    ),
+    on_duplicate: OnDuplicate = Query(
+        'skip',
+        description='What to do with readings that already exist for the same equipment and timestamp',
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    if not file.filename.endswith('.csv'):
         raise HTTPException(
             status_code=400,
-            detail='Error parsing the CSV file. Please check the file format.',
+            detail='File format not supported. Please upload a CSV file.',
         )
 
-    return {
+    result = ingest_csv(
+        db,
+        file.file,
+        current_user.id,
+        IngestionOptions(resumable=resumable, on_duplicate=on_duplicate),
+    )
+
+    response = {
         'detail': 'File processed successfully',
-        'sensors_added': len(sensor_data_list),
+        'sensors_added': result.sensors_added,
+        'duplicates': result.duplicates,
     }
+    if resumable:
+        response['resumed_from'] = result.resumed_from
+    return response
@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class IngestionJobOut(BaseModel):
+    id: str
+    filename: str
+    status: str
+    resumable: bool = False
+    on_duplicate: str = 'skip'
+    rows_processed: int
+    duplicates: int = 0
+    rows_per_second: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
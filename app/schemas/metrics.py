@@ -0,0 +1,33 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class WriteBufferMetrics(BaseModel):
+    depth: int
+    flushes: int
+    failed_flushes: int
+    rows_flushed: int
+    last_batch_size: int
+    max_batch_size: int
+    avg_batch_size: float
+    last_flush_ms: float
+    max_flush_ms: float
+    avg_flush_ms: float
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class HotCacheMetrics(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    reloads: int
+    evictions: int
+    equipment: int
+    readings: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MetricsOut(BaseModel):
+    write_buffer: WriteBufferMetrics
+    hot_cache: HotCacheMetrics
@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class RetentionPolicyCreate(BaseModel):
+    company_id: Optional[int] = None
+    equipment_id: Optional[int] = None
+    raw_days: Optional[int] = Field(
+        None, ge=1, description='Days raw readings are kept'
+    )
+    rollup_days: Optional[int] = Field(
+        None, ge=1, description='Days minute, hour and day rollups are kept'
+    )
+
+    @model_validator(mode='after')
+    def check_scope(self):
+        if (self.company_id is None) == (self.equipment_id is None):
+            raise ValueError('Set either company_id or equipment_id')
+        if (
+            self.raw_days
+            and self.rollup_days
+            and self.rollup_days < self.raw_days
+        ):
+            raise ValueError('rollup_days must not be shorter than raw_days')
+        return self
+
+
+class RetentionPolicyOut(RetentionPolicyCreate):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RetentionReport(BaseModel):
+    policy_id: int
+    company_id: Optional[int] = None
+    equipment_id: Optional[int] = None
+    equipment_count: int
+    raw_rows: int
+    raw_bytes: Optional[int] = None
+    rollup_rows: int
+    rollup_bytes: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -21,6 +22,77 @@ class SensorDataOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SensorDataGroup(BaseModel):
+    equipment_id: int
+    items: List[SensorDataOut]
+
+
+class SensorDataByEquipment(BaseModel):
+    groups: List[SensorDataGroup]
+
+
+class SensorDataPoint(BaseModel):
+    timestamp: datetime
+    value: float
+
+
+class SensorDataLatest(BaseModel):
+    equipment_id: int
+    timestamp: datetime
+    value: float
+
+
+class SensorDataRecent(BaseModel):
+    equipment_id: int
+    points: List[SensorDataPoint]
+
+
+class SensorDataSeries(BaseModel):
+    equipment_id: int
+    method: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    points: List[SensorDataPoint]
+
+
+class SensorDataBucket(BaseModel):
+    start: datetime
+    count: int
+    sum: float
+    avg: float
+    min: float
+    max: float
+
+
+class SensorDataAggregation(BaseModel):
+    equipment_id: int
+    interval: str
+    start: datetime
+    end: datetime
+    source: str
+    buckets: List[SensorDataBucket]
+
+
+class SensorDataAccepted(BaseModel):
+    equipment_id: int
+    timestamp: datetime
+    value: float
+    status: str
+
+
+class SensorDataBatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class SensorDataBatchResult(BaseModel):
+    accepted: int
+    inserted: int
+    duplicates: int
+    rejected: int
+    errors: List[SensorDataBatchError] = []
+
+
 class SensorDataInDB(SensorDataOut):
     pass
 
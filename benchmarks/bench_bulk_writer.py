@@ -0,0 +1,92 @@
+"""Compare the ORM bulk_save_objects path with the sensor_data bulk writer.
+
+Usage:
+    poetry run python -m benchmarks.bench_bulk_writer --rows 200000
+
+Runs against DATABASE_URL. Every run happens in a transaction that is
+rolled back, so the database is left untouched.
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.core.bulk_writer import write_sensor_data
+from app.core.database import engine
+from app.models.company import Company
+from app.models.equipment import Equipment
+from app.models.sensor_data import SensorData
+
+
+def build_frame(equipment_id: int, rows: int) -> pd.DataFrame:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        'equipment_id': equipment_id,
+        'timestamp': pd.date_range(start, periods=rows, freq='s'),
+        'value': np.random.default_rng(0).normal(75, 5, rows),
+    })
+
+
+def bench_bulk_save_objects(db: Session, frame: pd.DataFrame) -> None:
+    db.bulk_save_objects([
+        SensorData(
+            equipment_id=int(row.equipment_id),
+            timestamp=row.timestamp.to_pydatetime(),
+            value=float(row.value),
+        )
+        for row in frame.itertuples(index=False)
+    ])
+
+
+def bench_bulk_writer(db: Session, frame: pd.DataFrame) -> None:
+    write_sensor_data(db, frame)
+
+
+def run(name, func, rows: int, batch_size: int) -> None:
+    with Session(engine) as db:
+        company = Company(name='benchmark')
+        db.add(company)
+        db.flush()
+        equipment = Equipment(
+            company_id=company.id,
+            equipment_id=f'BENCH-{datetime.now().timestamp()}',
+        )
+        db.add(equipment)
+        db.flush()
+
+        frame = build_frame(equipment.id, rows)
+        started = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            func(db, frame.iloc[offset : offset + batch_size])
+        db.flush()
+        elapsed = time.perf_counter() - started
+        db.rollback()
+
+    print(
+        f'{name:<20} {rows:>10} rows {elapsed:>8.2f}s '
+        f'{rows / elapsed:>12,.0f} rows/s'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f'dialect: {engine.dialect.name}')
+    run(
+        'bulk_save_objects',
+        bench_bulk_save_objects,
+        args.rows,
+        args.batch_size,
+    )
+    run('bulk_writer', bench_bulk_writer, args.rows, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Compare ingest throughput of the old and new sensor_data layouts.
+
+Usage:
+    poetry run python -m benchmarks.bench_ingest --rows 1000000
+
+"before" is the layout up to the bigint migration: an integer id with a
+second B-tree on it next to the primary key. "after" is the current one:
+a bigint id covered by the primary key alone and a BRIN index on
+timestamp. Both get the unique (equipment_id, timestamp) key and the
+equipment/timestamp index, and are loaded with COPY in batches, the way
+the bulk writer loads readings.
+
+Runs against DATABASE_URL (PostgreSQL only). The tables are created in a
+transaction that is rolled back, so the database is left untouched.
+"""
+
+import argparse
+import io
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+
+LAYOUTS = {
+    'before': (
+        'CREATE TABLE bench_sensor_data_before ('
+        'id serial PRIMARY KEY, '
+        'equipment_id integer NOT NULL, '
+        'timestamp timestamp with time zone NOT NULL, '
+        'value double precision NOT NULL, '
+        'UNIQUE (equipment_id, timestamp))',
+        'CREATE INDEX ON bench_sensor_data_before (id)',
+        'CREATE INDEX ON bench_sensor_data_before '
+        '(equipment_id, timestamp DESC, id DESC)',
+    ),
+    'after': (
+        'CREATE TABLE bench_sensor_data_after ('
+        'id bigserial PRIMARY KEY, '
+        'equipment_id integer NOT NULL, '
+        'timestamp timestamp with time zone NOT NULL, '
+        'value double precision NOT NULL, '
+        'UNIQUE (equipment_id, timestamp))',
+        'CREATE INDEX ON bench_sensor_data_after '
+        '(equipment_id, timestamp DESC, id DESC)',
+        'CREATE INDEX ON bench_sensor_data_after USING brin (timestamp)',
+    ),
+}
+
+
+def build_frame(rows: int, devices: int) -> pd.DataFrame:
+    # Readings of `devices` equipment interleaved in time order, as they
+    # arrive from the field.
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return pd.DataFrame({
+        'equipment_id': np.arange(rows) % devices + 1,
+        'timestamp': pd.date_range(start, periods=rows, freq='s'),
+        'value': np.random.default_rng(0).normal(75, 5, rows),
+    })
+
+
+def render_batches(frame: pd.DataFrame, batch_size: int) -> list[str]:
+    # CSV is rendered up front so only the COPYs are timed.
+    return [
+        frame.iloc[offset : offset + batch_size].to_csv(
+            header=False,
+            index=False,
+            date_format='%Y-%m-%dT%H:%M:%S.%f%z',
+        )
+        for offset in range(0, len(frame), batch_size)
+    ]
+
+
+def copy_rows(db: Session, table: str, batch: str) -> None:
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {table} (equipment_id, timestamp, value) '
+            'FROM STDIN WITH (FORMAT csv)',
+            io.StringIO(batch),
+        )
+    finally:
+        cursor.close()
+
+
+def run(layout: str, batches: list[str], rows: int) -> None:
+    table = f'bench_sensor_data_{layout}'
+    with Session(engine) as db:
+        for statement in LAYOUTS[layout]:
+            db.execute(text(statement))
+
+        started = time.perf_counter()
+        for batch in batches:
+            copy_rows(db, table, batch)
+        elapsed = time.perf_counter() - started
+        index_bytes = db.scalar(
+            text('SELECT pg_indexes_size(to_regclass(:table))'),
+            {'table': table},
+        )
+        db.rollback()
+
+    print(
+        f'{layout:<8} {rows:>10} rows {elapsed:>8.2f}s '
+        f'{rows / elapsed:>12,.0f} rows/s '
+        f'{index_bytes / 2**20:>8.1f} MiB of indexes'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--devices', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    batches = render_batches(
+        build_frame(args.rows, args.devices), args.batch_size
+    )
+    for layout in LAYOUTS:
+        run(layout, batches, args.rows)
+
+
+if __name__ == '__main__':
+    main()
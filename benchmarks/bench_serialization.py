@@ -0,0 +1,86 @@
+"""Compare the per-row cost of rendering a page of sensor readings.
+
+Usage:
+    poetry run python -m benchmarks.bench_serialization --rows 100000
+
+`orm_pydantic` is the default FastAPI path: ORM entities validated into
+SensorDataOut and rendered by JSONResponse. `core_rows` is the path the
+sensor data routes take now: Core row tuples rendered by
+FastJSONResponse. Runs against DATABASE_URL inside a transaction that
+is rolled back.
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.bulk_writer import write_sensor_data
+from app.core.database import engine
+from app.core.readings import select_readings
+from app.core.serialization import FastJSONResponse, as_dicts
+from app.models.company import Company
+from app.models.equipment import Equipment
+from app.models.sensor_data import SensorData
+from app.schemas.sensor_data import SensorDataOut
+from benchmarks.bench_bulk_writer import build_frame
+
+
+def bench_orm_pydantic(db: Session, equipment_id: int) -> bytes:
+    items = db.scalars(
+        select(SensorData).filter(SensorData.equipment_id == equipment_id)
+    ).all()
+    content = jsonable_encoder([
+        SensorDataOut.model_validate(item).model_dump() for item in items
+    ])
+    return JSONResponse(content).body
+
+
+def bench_core_rows(db: Session, equipment_id: int) -> bytes:
+    result = db.execute(
+        select_readings().filter(SensorData.equipment_id == equipment_id)
+    )
+    return FastJSONResponse(as_dicts(result)).body
+
+
+def run(name, func, db: Session, equipment_id: int, rows: int) -> None:
+    db.expunge_all()
+    started = time.perf_counter()
+    body = func(db, equipment_id)
+    elapsed = time.perf_counter() - started
+    print(
+        f'{name:<16} {rows:>10} rows {elapsed:>8.3f}s '
+        f'{elapsed / rows * 1e6:>8.2f} us/row {len(body):>12,} bytes'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f'dialect: {engine.dialect.name}')
+    with Session(engine) as db:
+        company = Company(name='benchmark')
+        db.add(company)
+        db.flush()
+        equipment = Equipment(
+            company_id=company.id,
+            equipment_id=f'BENCH-{datetime.now().timestamp()}',
+        )
+        db.add(equipment)
+        db.flush()
+        write_sensor_data(db, build_frame(equipment.id, args.rows))
+        db.flush()
+
+        run('orm_pydantic', bench_orm_pydantic, db, equipment.id, args.rows)
+        run('core_rows', bench_core_rows, db, equipment.id, args.rows)
+        db.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Compare p99 latency of the sync and async database stacks under load.
+
+Usage:
+    poetry run python -m benchmarks.load_async --concurrency 200
+
+Serves two endpoints with uvicorn that run the same page query for the
+equipment with the most readings: one a sync route on a Session, which
+FastAPI runs in its worker thread pool, the other an async route on an
+AsyncSession. Both engines get the same pool size, so the difference is
+how many requests each stack can keep in flight. `--query-delay` adds a
+pg_sleep to every request to stand in for slow queries.
+
+A fixed number of clients then send requests back to back, one stack at a
+time, and the latency percentiles are printed. Runs against DATABASE_URL
+and only reads from it.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.core.database import SQLALCHEMY_DATABASE_URL, async_url
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_count import SensorDataCount
+
+SLEEP_SQL = text('SELECT pg_sleep(:delay)')
+
+
+def page_query(equipment_id: int):
+    # Core tables, so the ORM mappers never need configuring here.
+    table = SensorData.__table__
+    return (
+        select(
+            table.c.id, table.c.equipment_id, table.c.timestamp, table.c.value
+        )
+        .where(table.c.equipment_id == equipment_id)
+        .order_by(table.c.timestamp.desc())
+        .limit(50)
+    )
+
+
+def build_app(stack: str, pool_size: int, delay: float) -> FastAPI:
+    counts = SensorDataCount.__table__
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    with Session(engine) as db:
+        equipment_id = db.scalar(
+            select(counts.c.equipment_id)
+            .order_by(counts.c.row_count.desc())
+            .limit(1)
+        )
+    engine.dispose()
+    query = page_query(equipment_id or 0)
+
+    app = FastAPI()
+    if stack == 'sync':
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL, pool_size=pool_size, max_overflow=0
+        )
+
+        @app.get('/')
+        def read_sync():
+            with Session(engine) as db:
+                if delay:
+                    db.execute(SLEEP_SQL, {'delay': delay})
+                return len(db.execute(query).all())
+
+    else:
+        async_engine = create_async_engine(
+            async_url(SQLALCHEMY_DATABASE_URL),
+            pool_size=pool_size,
+            max_overflow=0,
+        )
+
+        @app.get('/')
+        async def read_async():
+            async with AsyncSession(async_engine) as db:
+                if delay:
+                    await db.execute(SLEEP_SQL, {'delay': delay})
+                return len((await db.execute(query)).all())
+
+    return app
+
+
+def serve(stack: str, pool_size: int, delay: float, port: int) -> None:
+    # A long keep-alive, so a client that is slow to send its next request
+    # under load does not find its connection closed.
+    uvicorn.run(
+        build_app(stack, pool_size, delay),
+        port=port,
+        log_level='warning',
+        timeout_keep_alive=60,
+    )
+
+
+def wait_for(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url).raise_for_status()
+            return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def load(url: str, concurrency: int, requests: int) -> list[float]:
+    latencies = []
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(url)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(
+        f'{name:<6} {len(latencies):>7} requests '
+        f'{len(latencies) / elapsed:>9,.0f} req/s '
+        f'p50 {p50:>8.1f}ms p95 {p95:>8.1f}ms p99 {p99:>8.1f}ms'
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--pool-size', type=int, default=40)
+    parser.add_argument(
+        '--query-delay',
+        type=float,
+        default=0.02,
+        help='Seconds of pg_sleep added to every request',
+    )
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    url = f'http://127.0.0.1:{args.port}/'
+    for stack in ('sync', 'async'):
+        # The server runs in its own process so it does not share the GIL
+        # with the clients.
+        server = multiprocessing.Process(
+            target=serve,
+            args=(stack, args.pool_size, args.query_delay, args.port),
+        )
+        server.start()
+        try:
+            wait_for(url)
+            # Warm up the pool and the thread pool first.
+            asyncio.run(load(url, args.concurrency, args.concurrency))
+            started = time.perf_counter()
+            latencies = asyncio.run(load(url, args.concurrency, args.requests))
+            report(stack, latencies, time.perf_counter() - started)
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,12 @@ import pytest
 import logging
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
-from app.core.database import Base, get_db
+from app.core.database import Base, async_url, get_async_db, get_db
 from app.main import app
 from app.core.security import get_password_hash
 from tests.factories import UserFactory, CompanyFactory, EquipmentFactory
@@ -19,6 +21,22 @@ def db_engine():
         engine = create_engine(postgres.get_connection_url())
         yield engine
 
+@pytest.fixture(scope="session")
+def async_db_engine(db_engine):
+    # Every TestClient request runs on a new event loop, so asyncpg
+    # connections cannot be pooled across requests.
+    engine = create_async_engine(async_url(db_engine.url.render_as_string(hide_password=False)), poolclass=NullPool)
+    yield engine
+
+
+@pytest.fixture
+def override_get_async_db(async_db_engine):
+    async def override():
+        async with AsyncSession(async_db_engine, expire_on_commit=False) as session:
+            yield session
+
+    return override
+
 @pytest.fixture(scope="function")
 def db(db_engine):
     Base.metadata.create_all(db_engine)
@@ -31,7 +49,7 @@ def db(db_engine):
     Base.metadata.drop_all(db_engine)
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, override_get_async_db):
     def override_get_db():
         try:
             yield db
@@ -39,8 +57,10 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_async_db]
 
 @pytest.fixture
 def user(db):
@@ -1,5 +1,11 @@
+from datetime import datetime, timedelta, timezone
+
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
 
+from app.core.columnar import utc_isoformat
+from app.core.database import ReplicaRouter
+from app.core.serialization import FastJSONResponse
 from app.main import app
 
 client = TestClient(app)
@@ -9,4 +15,49 @@ def test_health_check():
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "healthy"
-    assert data["database"] == "connected"
\ No newline at end of file
+    assert data["database"] == "connected"
+
+def test_replica_router(db_engine):
+    unreachable = create_engine("postgresql://nobody@127.0.0.1:1/missing")
+    router = ReplicaRouter([unreachable, db_engine], max_lag=5, sticky=60, check_interval=60)
+
+    # The unreachable replica is skipped, whichever one is tried first.
+    assert router.choose("Bearer a") is db_engine
+    assert router.choose("Bearer a") is db_engine
+
+    # Clients read from the primary for a while after writing.
+    router.mark_write("Bearer a")
+    assert router.choose("Bearer a") is None
+    assert router.choose("Bearer b") is db_engine
+
+    router.mark_down(db_engine)
+    assert router.choose("Bearer b") is None
+
+def test_replica_router_without_sticky_reads(db_engine):
+    router = ReplicaRouter([db_engine], max_lag=5, sticky=0, check_interval=60)
+
+    # The write's window is over at once, which empties the map.
+    router.mark_write("Bearer a")
+    router.mark_write("Bearer a")
+    assert router.choose("Bearer a") is db_engine
+
+def test_fast_json_response_renders_utc():
+    eastern = timezone(timedelta(hours=-5))
+    response = FastJSONResponse([
+        {"id": 1, "timestamp": datetime(2023, 8, 18, 9, 0, tzinfo=eastern), "value": 70.5},
+        {"id": 2, "timestamp": datetime(2023, 8, 18, 14, 0, 0, 123456), "value": -1.0},
+        {"id": 3, "timestamp": datetime(2023, 8, 18, 14, 1, tzinfo=timezone.utc), "value": 72},
+        {"name": "Kühlraum", "timestamp": None},
+    ])
+    assert response.body == (
+        b'[{"id":1,"timestamp":"2023-08-18T14:00:00Z","value":70.5},'
+        b'{"id":2,"timestamp":"2023-08-18T14:00:00.123456Z","value":-1.0},'
+        b'{"id":3,"timestamp":"2023-08-18T14:01:00Z","value":72},'
+        b'{"name":"K\xc3\xbchlraum","timestamp":null}]'
+    )
+
+
+def test_utc_isoformat():
+    eastern = timezone(timedelta(hours=-5))
+    assert utc_isoformat(datetime(2023, 8, 18, 9, 0, tzinfo=eastern)) == "2023-08-18T14:00:00+00:00"
+    assert utc_isoformat(datetime(2023, 8, 18, 14, 0)) == "2023-08-18T14:00:00+00:00"
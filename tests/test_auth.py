@@ -7,7 +7,7 @@ from jose import jwt
 import time
 from datetime import timedelta
 
-from app.core.database import Base, get_db
+from app.core.database import Base, get_async_db, get_db
 from app.main import app
 from app.core.security import create_refresh_token, get_password_hash
 from app.core.config import settings
@@ -32,7 +32,7 @@ def db(db_engine):
     Base.metadata.drop_all(db_engine)
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, override_get_async_db):
     def override_get_db():
         try:
             yield db
@@ -40,8 +40,10 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_async_db]
 
 @pytest.fixture
 def seed_data(db: Session):
@@ -5,7 +5,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from testcontainers.postgres import PostgresContainer
 
-from app.core.database import Base, get_db
+from app.core.database import Base, get_async_db, get_db
 from app.main import app
 from app.core.security import get_password_hash
 from tests.factories import UserFactory
@@ -31,7 +31,7 @@ def db(db_engine):
     Base.metadata.drop_all(db_engine)
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, override_get_async_db):
     def override_get_db():
         try:
             yield db
@@ -39,8 +39,10 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     del app.dependency_overrides[get_db]
+    del app.dependency_overrides[get_async_db]
 
 @pytest.fixture
 def user(db):
@@ -0,0 +1,53 @@
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import BigInteger, inspect, text
+
+REDUNDANT_ID_INDEXES = {
+    "ix_companies_id": "companies",
+    "ix_equipment_id": "equipment",
+    "ix_ingestion_checkpoints_id": "ingestion_checkpoints",
+    "ix_retention_policies_id": "retention_policies",
+    "ix_sensor_data_id": "sensor_data",
+    "ix_users_id": "users",
+}
+
+
+def alembic_config(connection) -> Config:
+    config = Config()
+    config.set_main_option("script_location", "alembic")
+    config.attributes["connection"] = connection
+    return config
+
+
+@pytest.fixture
+def migrated_engine(db_engine):
+    # The schema as the migrations build it, rather than create_all.
+    with db_engine.begin() as connection:
+        command.upgrade(alembic_config(connection), "head")
+    try:
+        yield db_engine
+    finally:
+        # The oldest downgrades cannot run, so drop everything instead.
+        with db_engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+
+
+def test_sensor_data_id_is_bigint(migrated_engine):
+    inspector = inspect(migrated_engine)
+    columns = {column["name"]: column for column in inspector.get_columns("sensor_data")}
+    assert isinstance(columns["id"]["type"], BigInteger)
+
+    with migrated_engine.connect() as connection:
+        sequence_type = connection.scalar(
+            text("SELECT data_type FROM information_schema.sequences WHERE sequence_name = 'sensor_data_id_seq'")
+        )
+    assert sequence_type == "bigint"
+
+
+def test_redundant_id_indexes_dropped(migrated_engine):
+    inspector = inspect(migrated_engine)
+    for index, table in REDUNDANT_ID_INDEXES.items():
+        assert index not in {index["name"] for index in inspector.get_indexes(table)}
+    assert "ix_sensor_data_timestamp_brin" in {index["name"] for index in inspector.get_indexes("sensor_data")}
@@ -0,0 +1,988 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core import columnar, downsampling, ingestion, jobs
+from app.core.bulk_writer import upsert_sensor_reading, write_sensor_data
+from app.core.config import settings
+from app.core.database import CLIENT_KEY, replica_router
+from app.core.hot_cache import STAGED_KEY, hot_cache
+from app.core.partitions import (
+    create_partition,
+    detach_partition,
+    ensure_partitions,
+    floor_partition,
+    is_partitioned,
+    list_partitions,
+    next_partition,
+)
+from app.core.retention import apply_retention
+from app.core.rollups import refresh_pending_rollups, refresh_rollups
+from app.core.write_buffer import write_buffer
+from app.models.equipment import Equipment
+from app.models.retention_policy import RetentionPolicy
+from app.models.sensor_data import SensorData
+from app.models.sensor_data_count import SensorDataCount
+from app.models.sensor_data_rollup import SensorDataRollupDay, SensorDataRollupHour
+from app.models.user import User, user_company
+from tests.factories import CompanyFactory, EquipmentFactory
+
+
+@pytest.fixture(autouse=True)
+def clear_hot_cache():
+    # Equipment ids are reused once the tables are recreated.
+    hot_cache.clear()
+
+
+@pytest.fixture
+def admin_access(db: Session, user: User, equipment: Equipment):
+    db.execute(user_company.insert().values(user_id=user.id, company_id=equipment.company_id, role="admin"))
+    db.commit()
+    db.refresh(equipment)
+    return {"id": equipment.id, "equipment_id": equipment.equipment_id, "company_id": equipment.company_id}
+
+
+def build_csv(equipment_id: str, rows: int, delimiter: str = ",") -> bytes:
+    lines = [delimiter.join(["equipmentId", "timestamp", "value"])]
+    for i in range(rows):
+        lines.append(delimiter.join([equipment_id, f"2023-08-18T09:{i % 60:02d}:00.000-05:00", str(70 + i)]))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def upload(client: TestClient, token: str, content: bytes, filename: str = "readings.csv"):
+    return client.post(
+        "/api/v1/upload-csv/",
+        files={"file": (filename, content, "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+def test_upload_csv(client: TestClient, db: Session, admin_access: dict, token: str):
+    response = upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["sensors_added"] == 5
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 5
+
+
+def test_upload_csv_in_batches(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_BATCH_SIZE", 3)
+    monkeypatch.setattr(settings, "CSV_READ_CHUNK_SIZE", 64)
+    monkeypatch.setattr(settings, "CSV_SNIFF_BYTES", 64)
+    response = upload(client, token, build_csv(admin_access["equipment_id"], 10, delimiter=";"))
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["sensors_added"] == 10
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 10
+
+
+def test_upload_csv_resumes_from_checkpoint(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_BATCH_SIZE", 3)
+    monkeypatch.setattr(settings, "CSV_COMMIT_ROWS", 3)
+    content = build_csv(admin_access["equipment_id"], 10)
+    write_sensor_data = ingestion.write_sensor_data
+    calls = []
+
+    def failing_write(db, frame, on_duplicate):
+        calls.append(len(frame))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return write_sensor_data(db, frame, on_duplicate)
+
+    monkeypatch.setattr(ingestion, "write_sensor_data", failing_write)
+    with pytest.raises(RuntimeError):
+        client.post(
+            "/api/v1/upload-csv/?resumable=true",
+            files={"file": ("readings.csv", content, "text/csv")},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 6
+
+    monkeypatch.setattr(ingestion, "write_sensor_data", write_sensor_data)
+    response = client.post(
+        "/api/v1/upload-csv/?resumable=true",
+        files={"file": ("readings.csv", content, "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["resumed_from"] == 6
+    assert response.json()["sensors_added"] == 4
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 10
+
+    response = client.post(
+        "/api/v1/upload-csv/?resumable=true",
+        files={"file": ("readings.csv", content, "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.json()["sensors_added"] == 0
+
+
+@pytest.mark.parametrize("encoding", ["utf-8-sig", "utf-16", "latin-1"])
+def test_upload_csv_encodings(client: TestClient, db: Session, admin_access: dict, token: str, encoding: str):
+    content = build_csv(admin_access["equipment_id"], 3).decode("utf-8")
+    content = content.replace("equipmentId,timestamp,value", "equipmentId,timestamp,value,note")
+    content = "\n".join(line + ",café" if i else line for i, line in enumerate(content.splitlines())) + "\n"
+    response = upload(client, token, content.encode(encoding))
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["sensors_added"] == 3
+
+
+def test_upload_csv_invalid_byte_after_sample(client: TestClient, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "CSV_SNIFF_BYTES", 64)
+    content = build_csv(admin_access["equipment_id"], 5) + b"\xff\xfe,2023-08-18T09:30:00.000-05:00,1.0\n"
+    response = upload(client, token, content)
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Could not decode file content")
+
+
+def test_upload_csv_missing_columns(client: TestClient, admin_access: dict, token: str):
+    response = upload(client, token, b"equipmentId,value\nEQ00001,1.0\n")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Missing required columns")
+
+
+def test_upload_csv_reports_invalid_rows(client: TestClient, admin_access: dict, token: str):
+    content = (
+        "equipmentId,timestamp,value\n"
+        f"{admin_access['equipment_id']},2023-08-18T09:30:00.000-05:00,1.5\n"
+        f"{admin_access['equipment_id']},not-a-date,2.5\n"
+        f"{admin_access['equipment_id']},2023-08-18T09:40:00.000-05:00,abc\n"
+    ).encode("utf-8")
+    response = upload(client, token, content)
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert "Error processing row 1: invalid timestamp" in detail
+    assert "Error processing row 2: invalid value" in detail
+
+
+def test_upload_csv_unknown_equipment(client: TestClient, admin_access: dict, token: str):
+    response = upload(client, token, build_csv("UNKNOWN", 2))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Equipment with ID UNKNOWN not found"
+
+
+def test_upload_csv_queries_scale_with_devices(client: TestClient, db: Session, admin_access: dict, token: str):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if "sensor_data" not in statement:
+            statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        small = upload(client, token, build_csv(admin_access["equipment_id"], 2))
+        small_count = len(statements)
+        statements.clear()
+        large = upload(client, token, build_csv(admin_access["equipment_id"], 200))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert small.status_code == 200
+    assert large.status_code == 200
+    assert len(statements) == small_count
+
+
+def test_upload_csv_forbidden_equipment(client: TestClient, db: Session, admin_access: dict, token: str):
+    other_company = CompanyFactory()
+    db.add(other_company)
+    db.commit()
+    other_equipment = EquipmentFactory(company=other_company)
+    db.add(other_equipment)
+    db.commit()
+    other_code = other_equipment.equipment_id
+
+    response = upload(client, token, build_csv(other_code, 2))
+    assert response.status_code == 403
+    assert response.json()["detail"] == f"You don't have access to equipment {other_code}"
+
+
+def test_upload_csv_wrong_extension(client: TestClient, admin_access: dict, token: str):
+    response = upload(client, token, build_csv(admin_access["equipment_id"], 1), filename="readings.txt")
+    assert response.status_code == 400
+
+
+def test_create_sensor_data_batch(client: TestClient, db: Session, admin_access: dict, token: str):
+    readings = [
+        {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:30:00.000-05:00", "value": 1.5},
+        {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:35:00.000-05:00", "value": "abc"},
+        {"equipmentId": "UNKNOWN", "timestamp": "2023-08-18T09:40:00.000-05:00", "value": 2.5},
+        {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:45:00.000-05:00", "value": 3.5},
+    ]
+    response = client.post("/api/v1/sensor-data/batch", json=readings, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    data = response.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 2
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    assert data["errors"][1]["detail"] == "Equipment with ID UNKNOWN not found"
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 2
+
+
+def test_create_sensor_data_batch_ndjson(client: TestClient, db: Session, admin_access: dict, token: str):
+    lines = [
+        f'{{"equipmentId": "{admin_access["equipment_id"]}", "timestamp": "2023-08-18T09:30:00Z", "value": 1.0}}',
+        "{not json",
+        f'{{"equipmentId": "{admin_access["equipment_id"]}", "timestamp": "2023-08-18T09:31:00Z", "value": 2.0}}',
+    ]
+    response = client.post(
+        "/api/v1/sensor-data/batch",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    data = response.json()
+    assert data["accepted"] == 2
+    assert data["rejected"] == 1
+    assert data["errors"][0]["index"] == 1
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 2
+
+
+def test_upload_csv_job(client: TestClient, db: Session, admin_access: dict, token: str):
+    response = client.post(
+        "/api/v1/upload-csv/jobs",
+        files={"file": ("readings.csv", build_csv(admin_access["equipment_id"], 25), "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 202, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    job_id = response.json()["id"]
+
+    for _ in range(100):
+        job = client.get(f"/api/v1/ingestion-jobs/{job_id}", headers={"Authorization": f"Bearer {token}"}).json()
+        if job["status"] in {"succeeded", "failed"}:
+            break
+        time.sleep(0.05)
+
+    assert job["status"] == "succeeded", job
+    assert job["rows_processed"] == 25
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 25
+
+
+def test_ingestion_jobs_cancelled_at_shutdown(client: TestClient, admin_access: dict, token: str, monkeypatch):
+    # One worker, kept busy, so the uploaded job stays queued.
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+    monkeypatch.setattr(jobs, "_executor", executor)
+
+    response = client.post(
+        "/api/v1/upload-csv/jobs",
+        files={"file": ("readings.csv", build_csv(admin_access["equipment_id"], 5), "text/csv")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 202
+    job = jobs.get_job(response.json()["id"])
+    assert os.path.exists(job.path)
+
+    jobs.shutdown()
+    release.set()
+    assert job.status == "failed"
+    assert job.finished_at is not None
+    assert not os.path.exists(job.path)
+
+
+def test_ingestion_jobs_pending_limit(client: TestClient, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_MAX_PENDING_JOBS", 1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait)
+    monkeypatch.setattr(jobs, "_executor", executor)
+
+    def submit(_):
+        return client.post(
+            "/api/v1/upload-csv/jobs",
+            files={"file": ("readings.csv", build_csv(admin_access["equipment_id"], 5), "text/csv")},
+            headers={"Authorization": f"Bearer {token}"},
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=4) as uploads:
+        statuses = sorted(uploads.map(submit, range(4)))
+    jobs.shutdown()
+    release.set()
+    assert statuses == [202, 503, 503, 503]
+
+
+def test_read_unknown_ingestion_job(client: TestClient, token: str):
+    response = client.get("/api/v1/ingestion-jobs/unknown", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+
+
+def test_reupload_csv_skips_duplicates(client: TestClient, db: Session, admin_access: dict, token: str):
+    content = build_csv(admin_access["equipment_id"], 5)
+    assert upload(client, token, content).json()["sensors_added"] == 5
+
+    response = upload(client, token, content)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["sensors_added"] == 0
+    assert response.json()["duplicates"] == 5
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 5
+
+
+def test_create_sensor_data_is_idempotent(client: TestClient, admin_access: dict, token: str):
+    reading = {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:30:00Z", "value": 1.5}
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.post("/api/v1/sensor-data", json=reading, headers=headers)
+    assert first.status_code == 200, f"Unexpected status code: {first.status_code}, Response: {first.text}"
+    assert first.headers["X-Inserted-Count"] == "1"
+
+    retry = client.post("/api/v1/sensor-data", json=reading, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["X-Duplicate-Count"] == "1"
+    assert retry.json()["id"] == first.json()["id"]
+
+    updated = client.post("/api/v1/sensor-data?on_duplicate=update", json={**reading, "value": 2.5}, headers=headers)
+    assert updated.json()["id"] == first.json()["id"]
+    assert updated.json()["value"] == 2.5
+
+    rejected = client.post("/api/v1/sensor-data?on_duplicate=error", json=reading, headers=headers)
+    assert rejected.status_code == 409
+
+
+def test_create_sensor_data_batch_reports_duplicates(client: TestClient, admin_access: dict, token: str):
+    readings = [
+        {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:30:00Z", "value": 1.0},
+        {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:31:00Z", "value": 2.0},
+    ]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/api/v1/sensor-data/batch", json=readings[:1], headers=headers)
+
+    response = client.post("/api/v1/sensor-data/batch?on_duplicate=update", json=readings, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    data = response.json()
+    assert data["accepted"] == 2
+    assert data["inserted"] == 1
+    assert data["duplicates"] == 1
+
+
+def test_create_sensor_data_buffered(client: TestClient, db: Session, admin_access: dict, token: str):
+    headers = {"Authorization": f"Bearer {token}"}
+    reading = {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:30:00Z", "value": 1.5}
+
+    response = client.post("/api/v1/sensor-data?write_mode=buffered", json=reading, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["status"] == "stored"
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 1
+
+    response = client.post(
+        "/api/v1/sensor-data?write_mode=fire_and_forget",
+        json={**reading, "timestamp": "2023-08-18T09:31:00Z"},
+        headers=headers,
+    )
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+    write_buffer.flush()
+    assert db.query(SensorData).filter(SensorData.equipment_id == admin_access["id"]).count() == 2
+
+    metrics = client.get("/api/v1/metrics", headers=headers).json()["write_buffer"]
+    assert metrics["depth"] == 0
+    assert metrics["rows_flushed"] >= 2
+
+
+def test_background_writes_keep_client_on_primary(
+    client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch
+):
+    headers = {"Authorization": f"Bearer {token}"}
+    # As get_db would, which the test client overrides.
+    db.info[CLIENT_KEY] = headers["Authorization"]
+    writes = []
+    monkeypatch.setattr(replica_router, "mark_write", writes.append)
+
+    reading = {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T09:30:00Z", "value": 1.5}
+    response = client.post("/api/v1/sensor-data?write_mode=buffered", json=reading, headers=headers)
+    assert response.json()["status"] == "stored"
+    assert writes == [headers["Authorization"]]
+
+    response = client.post(
+        "/api/v1/upload-csv/jobs",
+        files={"file": ("readings.csv", build_csv(admin_access["equipment_id"], 5), "text/csv")},
+        headers=headers,
+    )
+    job = jobs.get_job(response.json()["id"])
+    for _ in range(100):
+        if job.finished_at:
+            break
+        time.sleep(0.05)
+    assert job.status == "succeeded", job.error
+    assert writes[1:] and set(writes) == {headers["Authorization"]}
+
+
+def test_read_sensor_data_by_cursor(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 7))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    timestamps = []
+    params = {"equipment_id": admin_access["id"], "size": 3}
+    while True:
+        response = client.get("/api/v1/sensor-data/cursor", params=params, headers=headers)
+        assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+        page = response.json()
+        timestamps += [item["timestamp"] for item in page["items"]]
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert len(timestamps) == 7
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+@pytest.mark.parametrize("total_mode", ["counter", "exact", "estimate"])
+def test_read_sensor_data_totals(client: TestClient, admin_access: dict, token: str, total_mode: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 7))
+    upload(client, token, build_csv(admin_access["equipment_id"], 9))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(
+        "/api/v1/sensor-data",
+        params={"equipment_id": admin_access["id"], "limit": 5, "total_mode": total_mode},
+        headers=headers,
+    )
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    page = response.json()
+    assert len(page["items"]) == 5
+    assert page["total_estimated"] == (total_mode == "estimate")
+    if total_mode != "estimate":
+        assert page["total"] == 9
+
+    response = client.get(
+        "/api/v1/sensor-data",
+        params={"equipment_id": admin_access["id"], "include_total": False},
+        headers=headers,
+    )
+    assert response.json()["total"] is None
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_read_downsampled_sensor_data(client: TestClient, admin_access: dict, token: str, method: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 60))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(
+        "/api/v1/sensor-data/downsampled",
+        params={"equipment_id": admin_access["id"], "points": 10, "method": method},
+        headers=headers,
+    )
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    points = response.json()["points"]
+    assert 2 <= len(points) <= 10
+    assert [point["timestamp"] for point in points] == sorted(point["timestamp"] for point in points)
+    values = [point["value"] for point in points]
+    assert min(values) == 70
+    assert max(values) == 129
+
+
+def test_read_downsampled_sensor_data_bounds_candidates(client: TestClient, admin_access: dict, token: str, monkeypatch):
+    upload(client, token, build_csv(admin_access["equipment_id"], 60))
+    headers = {"Authorization": f"Bearer {token}"}
+    sizes = []
+    lttb = downsampling.lttb
+
+    def record(x, y, threshold):
+        sizes.append(len(x))
+        return lttb(x, y, threshold)
+
+    monkeypatch.setattr(downsampling, "lttb", record)
+    response = client.get(
+        "/api/v1/sensor-data/downsampled",
+        params={"equipment_id": admin_access["id"], "points": 3},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert len(response.json()["points"]) == 3
+    assert sizes and sizes[0] <= 3 * downsampling.LTTB_CANDIDATE_RATIO
+
+
+def test_read_sensor_data_time_range(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 10))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {
+        "equipment_id": admin_access["id"],
+        "start": "2023-08-18T14:02:00Z",
+        "end": "2023-08-18T14:05:00Z",
+    }
+
+    response = client.get("/api/v1/sensor-data", params=params, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["total"] == 3
+    assert [item["value"] for item in response.json()["items"]] == [74, 73, 72]
+
+    response = client.get("/api/v1/sensor-data", params={**params, "end": params["start"]}, headers=headers)
+    assert response.status_code == 400
+
+    # Naive bounds are read as UTC.
+    response = client.get("/api/v1/sensor-data", params={**params, "start": "2023-08-18T14:02:00"}, headers=headers)
+    assert response.json()["total"] == 3
+    response = client.get("/api/v1/sensor-data", params={**params, "start": "2023-08-18T14:05:00"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_read_sensor_data_aggregate(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 30))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {
+        "equipment_id": admin_access["id"],
+        "start": "2023-08-18T14:00:00Z",
+        "end": "2023-08-18T15:00:00Z",
+        "interval": "minute",
+    }
+
+    response = client.get("/api/v1/sensor-data/aggregate", params=params, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    buckets = response.json()["buckets"]
+    assert len(buckets) == 30
+    assert buckets[0]["count"] == 1
+    assert buckets[0]["avg"] == 70
+
+    response = client.get("/api/v1/sensor-data/aggregate", params={**params, "interval": "hour"}, headers=headers)
+    (bucket,) = response.json()["buckets"]
+    assert bucket["start"].startswith("2023-08-18T14:00:00")
+    assert bucket["count"] == 30
+    assert bucket["sum"] == sum(range(70, 100))
+    assert (bucket["min"], bucket["max"]) == (70, 99)
+
+    response = client.get("/api/v1/sensor-data/aggregate", params={**params, "start": "2000-01-01T00:00:00Z"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_read_sensor_data_aggregate_from_rollups(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "SENSOR_ROLLUP_INLINE_BUCKETS", 0)
+    upload(client, token, build_csv(admin_access["equipment_id"], 30))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {
+        "equipment_id": admin_access["id"],
+        "start": "2023-08-18T00:00:00Z",
+        "end": "2023-08-19T00:00:00Z",
+        "interval": "hour",
+    }
+
+    # Large loads leave their buckets to the refresher, so raw readings
+    # answer for those buckets until it has run.
+    raw = client.get("/api/v1/sensor-data/aggregate", params=params, headers=headers).json()
+    assert raw["source"].split(",")[-1] == "sensor_data"
+    assert refresh_pending_rollups(db, limit=1000) == 30
+
+    rolled_up = client.get("/api/v1/sensor-data/aggregate", params=params, headers=headers).json()
+    assert rolled_up["source"] == "sensor_data_rollup_1h"
+    assert rolled_up["buckets"] == raw["buckets"]
+
+    # A single reading leaves its bucket to the refresher too; the rest of
+    # the day is still read from rollups.
+    client.post(
+        "/api/v1/sensor-data?on_duplicate=update",
+        json={"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T14:00:00Z", "value": 170},
+        headers=headers,
+    )
+    daily = client.get("/api/v1/sensor-data/aggregate", params={**params, "interval": "day"}, headers=headers).json()
+    assert daily["source"] == "sensor_data_rollup_1h,sensor_data_rollup_1m,sensor_data"
+    (bucket,) = daily["buckets"]
+    assert bucket["count"] == 30
+    assert bucket["max"] == 170
+
+    assert refresh_pending_rollups(db, limit=1000) == 1
+    refreshed = client.get("/api/v1/sensor-data/aggregate", params={**params, "interval": "day"}, headers=headers).json()
+    assert refreshed["source"] == "sensor_data_rollup_1d"
+    assert refreshed["buckets"] == daily["buckets"]
+
+
+def test_read_sensor_data_aggregate_without_end(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 30))
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post(
+        "/api/v1/sensor-data",
+        json={"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T13:59:45Z", "value": 50},
+        headers=headers,
+    )
+    params = {"equipment_id": admin_access["id"], "start": "2023-08-18T13:59:30Z", "interval": "day"}
+
+    # The range ends now, so only the whole hours and days in it come from
+    # rollups; the unaligned edges are read from finer tables.
+    response = client.get("/api/v1/sensor-data/aggregate", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    aggregation = response.json()
+    assert "sensor_data_rollup_1h" in aggregation["source"].split(",")
+    (bucket,) = aggregation["buckets"]
+    assert bucket["start"].startswith("2023-08-18T00:00:00")
+    assert bucket["count"] == 31
+    assert bucket["sum"] == sum(range(70, 100)) + 50
+    assert (bucket["min"], bucket["max"]) == (50, 99)
+
+    # A naive start is read as UTC.
+    response = client.get("/api/v1/sensor-data/aggregate", params={**params, "start": "2023-08-18T13:59:30"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["buckets"] == aggregation["buckets"]
+
+
+def test_concurrent_rollup_rebuilds_of_one_hour(db: Session, db_engine, equipment: Equipment, monkeypatch):
+    monkeypatch.setattr(settings, "SENSOR_ROLLUP_INLINE_BUCKETS", 0)
+    hour = datetime(2023, 8, 18, 14, tzinfo=timezone.utc)
+    upsert_sensor_reading(db, equipment.id, hour.replace(minute=1), 1.0)
+    upsert_sensor_reading(db, equipment.id, hour.replace(minute=2), 2.0)
+    db.commit()
+
+    # Two refreshers rebuild different minutes of the same hour. The
+    # second has to wait for the first to commit and then count its minute
+    # too.
+    refresh_rollups(db, [(equipment.id, hour.replace(minute=1))])
+
+    def refresh_second():
+        with Session(db_engine) as second:
+            refresh_rollups(second, [(equipment.id, hour.replace(minute=2))])
+            second.commit()
+
+    refresher = threading.Thread(target=refresh_second)
+    refresher.start()
+    refresher.join(timeout=1)
+    assert refresher.is_alive()
+    db.commit()
+    refresher.join(timeout=10)
+
+    db.expire_all()
+    hourly = db.get(SensorDataRollupHour, {"equipment_id": equipment.id, "bucket": hour})
+    assert (hourly.count, hourly.sum) == (2, 3.0)
+    daily = db.get(SensorDataRollupDay, {"equipment_id": equipment.id, "bucket": hour.replace(hour=0)})
+    assert (daily.count, daily.sum) == (2, 3.0)
+
+
+def test_read_sensor_data_by_equipment(client: TestClient, db: Session, admin_access: dict, token: str):
+    company_id = admin_access["company_id"]
+    second = EquipmentFactory(company=db.get(Equipment, admin_access["id"]).company)
+    db.add(second)
+    db.commit()
+    second_id, second_code = second.id, second.equipment_id
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    upload(client, token, build_csv(second_code, 2))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get(
+        "/api/v1/sensor-data/by-equipment",
+        params={"equipment_ids": [admin_access["id"], second_id], "limit": 3},
+        headers=headers,
+    )
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    groups = {group["equipment_id"]: group["items"] for group in response.json()["groups"]}
+    assert [item["value"] for item in groups[admin_access["id"]]] == [74, 73, 72]
+    assert [item["value"] for item in groups[second_id]] == [71, 70]
+
+    response = client.get("/api/v1/sensor-data/by-equipment", params={"company_id": company_id}, headers=headers)
+    assert response.status_code == 200
+    assert sorted(group["equipment_id"] for group in response.json()["groups"]) == sorted([admin_access["id"], second_id])
+
+    other_equipment = EquipmentFactory(company=CompanyFactory())
+    db.add(other_equipment)
+    db.commit()
+    response = client.get(
+        "/api/v1/sensor-data/by-equipment",
+        params={"equipment_ids": [admin_access["id"], other_equipment.id]},
+        headers=headers,
+    )
+    assert response.status_code == 403
+    response = client.get("/api/v1/sensor-data/by-equipment", params={"company_id": other_equipment.company_id}, headers=headers)
+    assert response.status_code == 403
+    response = client.get("/api/v1/sensor-data/by-equipment", params={"equipment_ids": [999999]}, headers=headers)
+    assert response.status_code == 404
+    response = client.get("/api/v1/sensor-data/by-equipment", headers=headers)
+    assert response.status_code == 400
+
+
+def test_read_sensor_data_columnar_json(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    headers = {"Authorization": f"Bearer {token}", "Accept": columnar.COLUMNAR_JSON_MEDIA_TYPE}
+
+    response = client.get("/api/v1/sensor-data", params={"equipment_id": admin_access["id"], "limit": 3}, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.headers["content-type"] == columnar.COLUMNAR_JSON_MEDIA_TYPE
+    assert response.headers["x-total-count"] == "5"
+    body = response.json()
+    assert body["value"] == [74, 73, 72]
+    assert body["equipment_id"] == [admin_access["id"]] * 3
+    assert body["timestamp"][0].startswith("2023-08-18T14:04:00")
+
+    response = client.get(
+        "/api/v1/sensor-data/by-equipment", params={"equipment_ids": [admin_access["id"]], "limit": 2}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["value"] == [74, 73]
+
+    headers["Accept"] = f"application/json, {columnar.COLUMNAR_JSON_MEDIA_TYPE};q=0.5"
+    response = client.get("/api/v1/sensor-data", params={"equipment_id": admin_access["id"]}, headers=headers)
+    assert len(response.json()["items"]) == 5
+
+
+def test_read_sensor_data_arrow(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    headers = {"Authorization": f"Bearer {token}", "Accept": columnar.ARROW_STREAM_MEDIA_TYPE}
+    params = {"equipment_id": admin_access["id"]}
+
+    response = client.get("/api/v1/sensor-data", params=params, headers=headers)
+    assert response.status_code == 200
+    table = columnar.pa.ipc.open_stream(response.content).read_all()
+    assert table.column("value").to_pylist() == [74, 73, 72, 71, 70]
+
+    headers["Accept"] = columnar.PARQUET_MEDIA_TYPE
+    response = client.get("/api/v1/sensor-data", params=params, headers=headers)
+    table = columnar.pq.read_table(columnar.pa.BufferReader(response.content))
+    assert table.num_rows == 5
+
+
+def test_export_sensor_data(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "SENSOR_STREAM_BATCH_SIZE", 2)
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"company_id": admin_access["company_id"], "start": "2023-08-18T14:01:00Z"}
+
+    response = client.get("/api/v1/sensor-data/export", params=params, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.headers["content-type"] == "application/x-ndjson"
+    readings = [json.loads(line) for line in response.text.splitlines()]
+    assert [reading["value"] for reading in readings] == [71, 72, 73, 74]
+
+    response = client.get("/api/v1/sensor-data/export", params={**params, "format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,equipment_id,timestamp,value"
+    assert len(lines) == 5
+
+    other_equipment = EquipmentFactory(company=CompanyFactory())
+    db.add(other_equipment)
+    db.commit()
+    response = client.get("/api/v1/sensor-data/export", params={"equipment_ids": [other_equipment.id]}, headers=headers)
+    assert response.status_code == 403
+
+
+def test_read_latest_sensor_data_from_hot_cache(client: TestClient, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"equipment_id": admin_access["id"]}
+
+    response = client.get("/api/v1/sensor-data/latest", params=params, headers=headers)
+    assert response.status_code == 200, f"Unexpected status code: {response.status_code}, Response: {response.text}"
+    assert response.json()["value"] == 74
+    assert hot_cache.stats.misses == 1
+
+    reading = {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-08-18T14:10:00Z", "value": 99}
+    client.post("/api/v1/sensor-data", json=reading, headers=headers)
+    client.post("/api/v1/sensor-data?on_duplicate=update", json={**reading, "value": 100}, headers=headers)
+    client.post("/api/v1/sensor-data/batch", json=[{**reading, "timestamp": "2023-08-18T14:05:00Z", "value": 75}], headers=headers)
+
+    response = client.get("/api/v1/sensor-data/recent", params={**params, "limit": 3}, headers=headers)
+    assert response.status_code == 200
+    assert [point["value"] for point in response.json()["points"]] == [100, 75, 74]
+    assert hot_cache.stats.hits == 1
+
+    response = client.get("/api/v1/sensor-data/recent", params={**params, "seconds": 60}, headers=headers)
+    assert response.json()["points"] == []
+
+    metrics = client.get("/api/v1/metrics", headers=headers).json()["hot_cache"]
+    assert metrics["hits"] == 2
+    assert metrics["equipment"] == 1
+    assert metrics["readings"] == 7
+
+
+def test_hot_cache_reloads_after_ttl(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"equipment_id": admin_access["id"]}
+    assert client.get("/api/v1/sensor-data/latest", params=params, headers=headers).json()["value"] == 74
+
+    # A write committed by another process never reaches this cache.
+    db.add(SensorData(equipment_id=admin_access["id"], timestamp=datetime(2023, 8, 18, 15, tzinfo=timezone.utc), value=80))
+    db.commit()
+    assert client.get("/api/v1/sensor-data/latest", params=params, headers=headers).json()["value"] == 74
+
+    monkeypatch.setattr(hot_cache, "ttl", 0)
+    assert client.get("/api/v1/sensor-data/latest", params=params, headers=headers).json()["value"] == 80
+    assert hot_cache.stats.reloads == 1
+    assert hot_cache.stats.readings == 6
+
+
+def test_hot_cache_stages_only_cacheable_readings(
+    client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch
+):
+    monkeypatch.setattr(hot_cache, "size", 3)
+    upload(client, token, build_csv(admin_access["equipment_id"], 2))
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"equipment_id": admin_access["id"]}
+    assert client.get("/api/v1/sensor-data/latest", params=params, headers=headers).json()["value"] == 71
+    other = EquipmentFactory(company=db.get(Equipment, admin_access["id"]).company)
+    db.add(other)
+    db.commit()
+
+    # Chunks of one long transaction; only the newest readings of the
+    # cached equipment are held until it commits.
+    for chunk in range(3):
+        timestamps = pd.date_range(f"2023-08-18T15:0{chunk}:00Z", periods=5, freq="s")
+        for equipment_id in (admin_access["id"], other.id):
+            frame = pd.DataFrame({"equipment_id": equipment_id, "timestamp": timestamps, "value": range(5)})
+            write_sensor_data(db, frame)
+        staged = db.info[STAGED_KEY]
+        assert len(staged) == 3
+        assert set(staged["equipment_id"]) == {admin_access["id"]}
+    db.commit()
+
+    response = client.get("/api/v1/sensor-data/recent", params={**params, "limit": 3}, headers=headers)
+    assert [point["timestamp"] for point in response.json()["points"]] == [
+        "2023-08-18T15:02:04Z",
+        "2023-08-18T15:02:03Z",
+        "2023-08-18T15:02:02Z",
+    ]
+
+
+def test_hot_cache_evicts_least_recently_read(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(hot_cache, "max_equipment", 1)
+    second = EquipmentFactory(company=db.get(Equipment, admin_access["id"]).company)
+    db.add(second)
+    db.commit()
+    second_id = second.id
+    upload(client, token, build_csv(second.equipment_id, 2))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get("/api/v1/sensor-data/latest", params={"equipment_id": admin_access["id"]}, headers=headers)
+    assert response.status_code == 404
+    response = client.get("/api/v1/sensor-data/latest", params={"equipment_id": second_id}, headers=headers)
+    assert response.json()["value"] == 71
+    assert hot_cache.stats.evictions == 1
+    assert hot_cache.stats.equipment == 1
+
+
+def test_partition_bounds(db: Session):
+    timestamp = datetime(2024, 12, 18, 15, 30, tzinfo=timezone.utc)
+    assert floor_partition(timestamp, "month") == datetime(2024, 12, 1, tzinfo=timezone.utc)
+    assert next_partition(floor_partition(timestamp, "month"), "month") == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert floor_partition(timestamp, "week") == datetime(2024, 12, 16, tzinfo=timezone.utc)
+    assert next_partition(floor_partition(timestamp, "day"), "day") == datetime(2024, 12, 19, tzinfo=timezone.utc)
+    # Tables made by create_all are not partitioned, so there is nothing to manage.
+    assert ensure_partitions(db) == []
+
+
+@pytest.fixture
+def partitioned_db(db: Session):
+    # create_all makes a plain table, so rebuild it the way the
+    # partitioning migration does.
+    config = Config()
+    config.set_main_option("script_location", "alembic")
+    migration = ScriptDirectory.from_config(config).get_revision("c8f3a2d6e1b7").module
+    with Operations.context(MigrationContext.configure(db.connection())):
+        migration.upgrade()
+    db.commit()
+    yield db
+    # Detached partitions are no longer dropped along with sensor_data.
+    db.rollback()
+    for name in db.scalars(text("SELECT tablename FROM pg_tables WHERE tablename LIKE 'sensor\\_data\\_p%'")):
+        db.execute(text(f"DROP TABLE {name}"))
+    db.commit()
+
+
+def test_ensure_partitions(partitioned_db: Session):
+    assert is_partitioned(partitioned_db)
+    newest = list_partitions(partitioned_db)[-1]
+
+    created = ensure_partitions(partitioned_db, now=newest.start, interval="month", ahead=2)
+    partitioned_db.commit()
+    assert len(created) == 2
+    assert created == [partition.name for partition in list_partitions(partitioned_db)[-2:]]
+    assert ensure_partitions(partitioned_db, now=newest.start, interval="month", ahead=2) == []
+
+
+def test_create_partition_moves_default_rows(client: TestClient, partitioned_db: Session, admin_access: dict, token: str):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    count_default = text("SELECT count(*) FROM sensor_data_default")
+    assert partitioned_db.scalar(count_default) == 5
+
+    name = create_partition(partitioned_db, datetime(2023, 8, 1, tzinfo=timezone.utc), datetime(2023, 9, 1, tzinfo=timezone.utc))
+    partitioned_db.commit()
+    assert partitioned_db.scalar(count_default) == 0
+    assert partitioned_db.scalar(text(f"SELECT count(*) FROM {name}")) == 5
+    assert partitioned_db.query(SensorData).count() == 5
+
+
+def test_detach_partition_updates_counts_and_hot_cache(
+    client: TestClient, partitioned_db: Session, admin_access: dict, token: str
+):
+    upload(client, token, build_csv(admin_access["equipment_id"], 5))
+    name = create_partition(partitioned_db, datetime(2023, 8, 1, tzinfo=timezone.utc), datetime(2023, 9, 1, tzinfo=timezone.utc))
+    partitioned_db.commit()
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"equipment_id": admin_access["id"]}
+    reading = {"equipmentId": admin_access["equipment_id"], "timestamp": "2023-09-01T00:00:00Z", "value": 99}
+    client.post("/api/v1/sensor-data", json=reading, headers=headers)
+    response = client.get("/api/v1/sensor-data/recent", params={**params, "limit": 10}, headers=headers)
+    assert len(response.json()["points"]) == 6
+
+    detach_partition(partitioned_db, name, drop=True)
+    partitioned_db.commit()
+    assert partitioned_db.get(SensorDataCount, admin_access["id"]).row_count == 1
+    assert partitioned_db.query(SensorData).count() == 1
+    assert hot_cache.stats.readings == 0
+
+    response = client.get("/api/v1/sensor-data/recent", params={**params, "limit": 10}, headers=headers)
+    assert [point["value"] for point in response.json()["points"]] == [99]
+    response = client.get("/api/v1/sensor-data", params=params, headers=headers)
+    assert response.json()["total"] == 1
+
+
+def test_retention_policies(client: TestClient, db: Session, admin_access: dict, token: str, monkeypatch):
+    monkeypatch.setattr(settings, "SENSOR_RETENTION_BATCH_SIZE", 7)
+    upload(client, token, build_csv(admin_access["equipment_id"], 30))
+    headers = {"Authorization": f"Bearer {token}"}
+    equipment_id = admin_access["id"]
+
+    company_policy = client.post(
+        "/api/v1/retention-policies",
+        json={"company_id": admin_access["company_id"], "rollup_days": 1},
+        headers=headers,
+    )
+    assert company_policy.status_code == 201
+    policy = client.post(
+        "/api/v1/retention-policies",
+        json={"equipment_id": equipment_id, "raw_days": 30, "rollup_days": 3650},
+        headers=headers,
+    )
+    assert policy.status_code == 201
+    duplicate = client.post(
+        "/api/v1/retention-policies", json={"equipment_id": equipment_id, "raw_days": 7}, headers=headers
+    )
+    assert duplicate.status_code == 409
+
+    # Policies of companies the user does not administer are left out.
+    other_company = CompanyFactory()
+    db.add(other_company)
+    db.flush()
+    db.add(RetentionPolicy(company_id=other_company.id, raw_days=1))
+    db.commit()
+
+    # The equipment's own policy overrides the company's, so nothing is
+    # reported for the company policy.
+    reports = client.get("/api/v1/retention-policies/report", headers=headers).json()
+    assert len(reports) == 2
+    by_policy = {report["policy_id"]: report for report in reports}
+    assert by_policy[company_policy.json()["id"]]["equipment_count"] == 0
+    report = by_policy[policy.json()["id"]]
+    assert report["raw_rows"] == 30
+    assert report["raw_bytes"] > 0
+    assert report["rollup_rows"] == 0
+
+    result = apply_retention(db)
+    assert result.raw_rows == 30
+    assert result.rollup_rows == 0
+    assert db.query(SensorData).filter(SensorData.equipment_id == equipment_id).count() == 0
+    assert db.get(SensorDataCount, equipment_id).row_count == 0
+
+    # The aggregates outlive the raw readings until their own cutoff.
+    params = {"equipment_id": equipment_id, "start": "2023-08-18T00:00:00Z", "end": "2023-08-19T00:00:00Z", "interval": "day"}
+    daily = client.get("/api/v1/sensor-data/aggregate", params=params, headers=headers).json()
+    assert daily["source"] == "sensor_data_rollup_1d"
+    assert daily["buckets"][0]["count"] == 30
+
+    result = apply_retention(db, now=datetime(2034, 1, 1, tzinfo=timezone.utc))
+    assert result.rollup_rows == 32